@@ -51,12 +51,6 @@ for aoi in "${IN_DIR}"/aoi_*_3857.geojson; do
 
   echo "=== $idx ==="
 
-  # Clip land polygons to AOI
-  ogr2ogr -overwrite -nlt PROMOTE_TO_MULTI \
-    -clipsrc "$aoi" \
-    "${OUT_DIR}/${idx}_land_clip.gpkg" \
-    "$OSM_LAND"
-
   # Robust extent parse (keeps negatives)
   ext=$(ogrinfo -al -so "$aoi" \
     | sed -n 's/^Extent: //p' \
@@ -73,6 +67,15 @@ for aoi in "${IN_DIR}"/aoi_*_3857.geojson; do
 
   echo "  extent: $xmin $ymin $xmax $ymax"
 
+  # Select land polygons intersecting the AOI extent (spatial index lookup).
+  # They are not clipped: gdal_rasterize -te already limits the burn to the
+  # extent, and clipping to the AOI shape would write false water (0) over land
+  # in the rest of the extent, which can mask land from neighbouring tiles in the VRT.
+  ogr2ogr -overwrite -nlt PROMOTE_TO_MULTI \
+    -spat "$xmin" "$ymin" "$xmax" "$ymax" -spat_srs EPSG:3857 \
+    "${OUT_DIR}/${idx}_land_clip.gpkg" \
+    "$OSM_LAND"
+
   out_tif="${OUT_DIR}/${idx}_landmask_${RES}m_3857.tif"
 
   gdal_rasterize \
@@ -4,6 +4,9 @@ from enum import Enum
 # Memory management
 MAX_WINDOW_SIZE_GB = 1.0  # Maximum window size in GB before chunking
 CHUNK_HEIGHT = 10000  # Number of rows to read per chunk
+PATCH_STRIP_MAX_GB = 0.25  # Budget for the row strip cut_patches reads at once
+WARP_MEM_LIMIT_MB = 512  # GDAL warp working memory for reprojection
+AOI_LOCAL_BUFFER_MAX_SPAN_DEG = 10.0  # Largest AOI extent buffered in a single local AEQD projection
 
 # CRS
 class CRS(Enum):
@@ -18,7 +21,11 @@ class CRS(Enum):
     UTM_38N = "EPSG:32638"
     UTM_39N = "EPSG:32639"
 
+    def __init__(self, value: str):
+        # parse the EPSG code once per member instead of on every int() call
+        self._epsg = int(value.split(":", 1)[1])
+
     def __int__(self):
-        return int(self.value[self.value.find(":") + 1:])
+        return self._epsg
 
 LOG_EPS = 1e-10
\ No newline at end of file
@@ -44,9 +44,12 @@ CAPELLA_YEARS = [2020, 2021, 2022, 2023, 2024, 2025]
 CAPELLA_MIN_RES = 1.0 # we want sub meter resolution
 CAPELLA_DEFAULT_OUT_CRS = 4326 # EPSG:4326
 MAX_SAR_TILE_MEMORY_GB = 2.0 # For job with 64 GB memory, conservative estimate of max
+CAPELLA_HEADER_READ_WORKERS = 16 # Threads opening tile headers concurrently (IO bound)
+SAR_GC_GROWTH_FACTOR = 1.5 # Full gc after a tile only once memory grew this much since the last one
 
 # GHSL CONSTANTS --------------------------------------------------------
 
 # Building detection thresholds
 GHSL_BUILDINGS_THRESHOLD = 0  # Threshold for GHSL building detection
 GHSL_MIN_BUILDING_COVG = 0.30
+GHSL_GDAL_CACHEMAX_MB = 512  # GDAL block cache while warping GHSL windows, so shared source blocks are decoded once
@@ -47,6 +47,24 @@ def threshold_fraction_filter(
     else: # else it's a lower bound
         return frac >= p.fraction_value
 
+def _eq_fraction_ok(
+    patch: np.ndarray,
+    filter_value: float | int,
+    nodata: Optional[float | int],
+    upper: bool,
+    fraction_value: float,
+) -> bool:
+    frac = patch_value_fraction(
+        patch=patch,
+        filter_value=filter_value,
+        nodata=nodata
+    )
+
+    if upper: # if the fraction we passed is an upper bound
+        return frac <= fraction_value
+    else: # else it's a lower bound
+        return frac >= fraction_value
+
 def threshold_fraction_filter_eq(
     patch: np.ndarray,
     ctx: Context,
@@ -56,14 +74,19 @@ def threshold_fraction_filter_eq(
     data == target_value meets minimum fraction.
     """
     p = ctx.threshold_fraction_filter_eq
-    frac = patch_value_fraction(
-        patch=patch,
-        filter_value=p.filter_value,
-        nodata=p.nodata
-    )
+    return _eq_fraction_ok(patch, p.filter_value, p.nodata, p.upper, p.fraction_value)
 
-    if p.upper: # if the fraction we passed is an upper bound
-        return frac <= p.fraction_value
-    else: # else it's a lower bound
-        return frac >= p.fraction_value
 
+def make_threshold_fraction_filter_eq(
+    filter_value: float | int,
+    nodata: Optional[float | int],
+    upper: bool,
+    fraction_value: float,
+) -> Callable[[np.ndarray, Context], bool]:
+    """
+    Build threshold_fraction_filter_eq with its params bound once, so the
+    per-patch call doesn't resolve them through the context.
+    """
+    def _filter(patch: np.ndarray, ctx: Context) -> bool:
+        return _eq_fraction_ok(patch, filter_value, nodata, upper, fraction_value)
+    return _filter
@@ -25,15 +25,22 @@ def patch_value_fraction(
     """
     Return fraction of pixels in `patch` equal to `value`, among valid pixels.
     """
-    if valid_pixels is None:
-        if nodata is None:
-            valid_pixels = np.ones(patch.shape, dtype=bool)
-        else:
-            valid_pixels = patch != nodata
-    valid_count = int(valid_pixels.sum())
-    if valid_count == 0:
+    if valid_pixels is not None:
+        valid_count = int(np.count_nonzero(valid_pixels))
+        if valid_count == 0:
+            return 0.0
+        hits = np.logical_and(patch == filter_value, valid_pixels)
+        return float(np.count_nonzero(hits) / valid_count)
+
+    # Without an explicit mask, every pixel equal to filter_value is valid
+    # (unless filter_value is the nodata value), so no AND with a mask is needed.
+    if nodata is None:
+        valid_count = patch.size
+    else:
+        valid_count = patch.size - int(np.count_nonzero(patch == nodata))
+    if valid_count == 0 or (nodata is not None and filter_value == nodata):
         return 0.0
-    return float(((patch == filter_value) & valid_pixels).sum() / valid_count)
+    return float(np.count_nonzero(patch == filter_value) / valid_count)
 
 def get_binary_mask_fraction(
     binary_mask: np.ndarray, 
@@ -69,26 +76,31 @@ def get_binary_mask_fraction(
         return default_fraction
     
     mask_patch = binary_mask[i:i+patch_size, j:j+patch_size]
-    if mask_patch.shape != (patch_size, patch_size):
-        mask_patch = np.pad(
-            mask_patch,
-            ((0, patch_size - mask_patch.shape[0]),
-             (0, patch_size - mask_patch.shape[1])),
-            mode="constant",
-            constant_values=background_value,
-        )
 
     if valid_pixels is None:
         if patch is None:
             raise ValueError("Provide either `valid_pixels` or `patch` to derive valid pixels.")
         valid_pixels = (patch != nodata)
 
-    valid_count = int(valid_pixels.sum())
+    valid_count = int(np.count_nonzero(valid_pixels))
     if valid_count == 0:
         return 0.0
 
-    target_pixels = (mask_patch == target_value) & valid_pixels
-    return float(target_pixels.sum() / valid_count)
+    # Edge patches: count on the unpadded overlap instead of padding the mask.
+    # Past the mask edge the mask is background_value, which only adds to the
+    # target count when background_value is itself the target.
+    h, w = mask_patch.shape
+    if valid_count == valid_pixels.size and valid_pixels.shape == (patch_size, patch_size):
+        # every pixel is valid (typical interior patch): no AND with the valid mask needed
+        target_count = int(np.count_nonzero(mask_patch == target_value))
+        inner_valid_count = h * w
+    else:
+        inner_valid = valid_pixels[..., :h, :w]
+        target_count = int(np.count_nonzero(np.logical_and(mask_patch == target_value, inner_valid)))
+        inner_valid_count = int(np.count_nonzero(inner_valid))
+    if background_value == target_value and (h, w) != (patch_size, patch_size):
+        target_count += valid_count - inner_valid_count
+    return float(target_count / valid_count)
     
 def calculate_threshold_fraction(
     data: np.ndarray,
@@ -97,27 +109,32 @@ def calculate_threshold_fraction(
     *,
     greater: bool = True,
     strict: bool = False,
+    mask: Optional[np.ndarray] = None,
 ) -> float:
     """
     Generic: fraction of valid pixels satisfying data >= filter_value (or <= filter_value).
+    mask (bool, same shape as data) restricts the count to its True pixels, without
+    gathering them into a copy first.
     """
-    valid = np.ones(data.shape, dtype=bool) if nodata is None else (data != nodata)
-    if greater:
-        if strict:
-            satisfied = data > filter_value
-        else:
-            satisfied = data >= filter_value   # NOTE: >= not >
+    if nodata is None:
+        valid = mask
     else:
-        if strict:
-            satisfied = data < filter_value
-        else:
-            satisfied = data <= filter_value
-
-    valid_count = int(valid.sum())
+        valid = np.not_equal(data, nodata)
+        if mask is not None:
+            np.logical_and(valid, mask, out=valid)
+    valid_count = data.size if valid is None else int(np.count_nonzero(valid))
     if valid_count == 0:
         return 0.0
 
-    return float((satisfied & valid).sum() / valid_count)
+    if greater:
+        op = np.greater if strict else np.greater_equal   # NOTE: >= not > by default
+    else:
+        op = np.less if strict else np.less_equal
+    satisfied = op(data, filter_value)
+    if valid is not None:
+        np.logical_and(satisfied, valid, out=satisfied)
+
+    return float(np.count_nonzero(satisfied) / valid_count)
 
 def get_land_fraction(
         land_mask: np.ndarray, 
@@ -146,19 +163,18 @@ def get_land_fraction(
     if land_mask is not None:
         land_patch = land_mask[i:i+patch_size, j:j+patch_size]
 
-        if land_patch.shape != (patch_size, patch_size):
-            land_patch = np.pad(
-                land_patch,
-                ((0, patch_size - land_patch.shape[0]),
-                (0, patch_size - land_patch.shape[1])),
-                mode="constant",
-                constant_values=255,
-            )
-        
         valid_land = (patch != nodata)
-        valid_count = valid_land.sum()
+        valid_count = np.count_nonzero(valid_land)
         if valid_count == 0:
             land_fraction = 0.0
         else:
-            land_fraction = ((land_patch == 1) & valid_land).sum() / valid_count
+            # Edge patches: the mask beyond the tile is nodata (255), never land,
+            # so only the unpadded overlap can contribute.
+            h, w = land_patch.shape
+            if valid_count == valid_land.size:
+                # every pixel is valid (typical interior patch): skip the AND
+                land_count = np.count_nonzero(land_patch == 1)
+            else:
+                land_count = np.count_nonzero((land_patch == 1) & valid_land[..., :h, :w])
+            land_fraction = land_count / valid_count
     return land_fraction
\ No newline at end of file
@@ -1,7 +1,7 @@
-from typing import Union
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Union
 import numpy as np
 from sat_img_utils.pipelines.context import Context
-from sat_img_utils.core.masks import get_valid_mask
 from sat_img_utils.configs.constants import LOG_EPS
 
 def log10_eps(img: np.ndarray) -> np.ndarray:
@@ -16,6 +16,162 @@ def clip_percentile(img: np.ndarray, low_percentile_val: float, high_percentile_
 def normalize_percentile(img: np.ndarray, low_percentile_val: float, high_percentile_val: float) -> np.ndarray:
     return (img - low_percentile_val) / (high_percentile_val - low_percentile_val) * 255
 
+def histogram_percentiles(
+    values: np.ndarray,
+    percentiles: Sequence[float],
+    bins: int = 4096,
+    value_range: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Approximate percentiles from a fixed-bin histogram: one O(N) bincount pass
+    instead of the partition behind np.percentile, and every requested percentile
+    comes from the same CDF. Accurate to one bin width, (hi - lo) / bins.
+
+    If value_range is None it is taken from the data; values outside an explicit
+    value_range are counted in the edge bins.
+    """
+    if value_range is None:
+        lo, hi = float(values.min()), float(values.max())
+    else:
+        lo, hi = value_range
+    if hi <= lo:
+        return np.full(len(percentiles), lo, dtype=np.float64)
+
+    # one float temporary, scaled in place, before the cast to bin indices
+    scaled = values - lo
+    scaled *= bins / (hi - lo)
+    idx = scaled.astype(np.intp)
+    del scaled
+    np.clip(idx, 0, bins - 1, out=idx)
+    cdf = np.cumsum(np.bincount(idx.ravel(), minlength=bins))
+    ranks = np.asarray(percentiles, dtype=np.float64) / 100.0 * (cdf[-1] - 1)
+    hit_bins = np.searchsorted(cdf, ranks, side="right")
+    return lo + (hit_bins + 0.5) * ((hi - lo) / bins)
+
+def sar_valid_mask(
+    img: np.ndarray,
+    nodata: float = 0.0,
+    scale_factor: float = 1.0,
+) -> np.ndarray:
+    """
+    Pixels that survive sar_log10 without hitting the LOG_EPS floor: finite,
+    not nodata, > 0 and img * scale_factor > LOG_EPS. The two lower bounds are
+    folded into one comparison against max(0, LOG_EPS / scale_factor) so no
+    scaled float copy of the image is made.
+    """
+    if scale_factor <= 0:
+        return np.zeros(img.shape, dtype=bool)
+    valid = img > max(0.0, LOG_EPS / scale_factor)    # also rejects NaN
+    if nodata is not None:
+        valid &= img != nodata
+    if np.issubdtype(img.dtype, np.floating):
+        valid &= np.isfinite(img)
+    return valid
+
+# uint16 SAR inputs only take 65536 values, so per-pixel log10 work can be
+# replaced by a lookup into a table computed once per parameter set.
+_UINT16_VALUES = np.arange(1 << 16, dtype=np.uint16)
+
+# Elements per bincount call in sar_db_percentiles
+_BINCOUNT_BLOCK = 1 << 22
+
+# Elements per block in sar_up_contrast_convert_to_uint8_pval (256 KiB of float32)
+_STRETCH_BLOCK = 1 << 16
+
+@lru_cache(maxsize=8)
+def _sar_db_lut(scale_factor: float) -> np.ndarray:
+    """float32 sar_log10 of every uint16 value."""
+    lut = sar_log10(_UINT16_VALUES.astype(np.float32), scale_factor)
+    lut.setflags(write=False)
+    return lut
+
+@lru_cache(maxsize=8)
+def _sar_pval_lut(
+    low_percentile_val: float,
+    high_percentile_val: float,
+    scale_factor: float,
+    nodata: Optional[float],
+) -> np.ndarray:
+    """uint8 output of sar_up_contrast_convert_to_uint8_pval for every uint16 value."""
+    valid = sar_valid_mask(_UINT16_VALUES, nodata=nodata, scale_factor=scale_factor)
+    lut = np.zeros(_UINT16_VALUES.shape, dtype=np.uint8)
+    values = _UINT16_VALUES[valid].astype(np.float32)
+    lut[valid] = sar_db_stretch_inplace(values, low_percentile_val, high_percentile_val, scale_factor)
+    lut.setflags(write=False)
+    return lut
+
+def _uint16_valid_cdf(img_uint16: np.ndarray, scale_factor: float, nodata: Optional[float]) -> np.ndarray:
+    """Cumulative counts of the sar_valid_mask pixels of a uint16 image, per raw value."""
+    flat = img_uint16.ravel()
+    counts = np.zeros(_UINT16_VALUES.size, dtype=np.int64)
+    for start in range(0, flat.size, _BINCOUNT_BLOCK):  # bincount upcasts its input to intp
+        counts += np.bincount(flat[start:start + _BINCOUNT_BLOCK], minlength=_UINT16_VALUES.size)
+    counts[~sar_valid_mask(_UINT16_VALUES, nodata=nodata, scale_factor=scale_factor)] = 0
+    return np.cumsum(counts)
+
+def _cdf_percentile_values(cdf: np.ndarray, percentiles: Sequence[float]) -> np.ndarray:
+    """Raw values at the given percentiles (lower rank) of a per-value cdf."""
+    ranks = np.asarray(percentiles, dtype=np.float64) / 100.0 * (cdf[-1] - 1)
+    return np.searchsorted(cdf, ranks, side="right")
+
+def sar_db_percentiles(
+    img: np.ndarray,
+    percentiles: Sequence[float],
+    scale_factor: float = 1.0,
+    nodata: float = 0.0,
+    max_samples: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Percentiles of sar_log10(img) over the pixels in sar_valid_mask.
+
+    For uint16 input this is a 65536-bin histogram of the raw values: log10 is
+    monotonic, so the raw-value percentile maps straight through the dB table.
+    No valid mask or dB array is built, and the result is exact (lower rank).
+    Other dtypes fall back to histogram_percentiles on the valid dB values.
+
+    With max_samples, larger images are first thinned to an evenly strided
+    (deterministic) subset of about max_samples pixels, trading exactness for speed.
+    """
+    if max_samples is not None and img.size > max_samples:
+        img = img.ravel()[::-(-img.size // max_samples)]
+    if img.dtype != np.uint16:
+        valid = sar_valid_mask(img, nodata=nodata, scale_factor=scale_factor)
+        # the boolean gather is already a copy, so sar_log10 is applied to it in place.
+        # valid already means img > LOG_EPS / scale_factor, so the LOG_EPS floor of
+        # sar_log10 can never apply here and is skipped.
+        values = img[valid]
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64)
+        values *= scale_factor
+        np.log10(values, out=values)
+        values *= 20.0
+        return histogram_percentiles(values, percentiles)
+
+    cdf = _uint16_valid_cdf(img, scale_factor, nodata)
+    if cdf[-1] == 0:
+        raise ValueError("No valid SAR pixels to compute percentiles from.")
+    raw_values = _cdf_percentile_values(cdf, percentiles)
+    return _sar_db_lut(scale_factor)[raw_values].astype(np.float64)
+
+def sar_db_stretch_inplace(
+    values: np.ndarray,
+    low_percentile_val: float,
+    high_percentile_val: float,
+    scale_factor: float = 1.0,
+) -> np.ndarray:
+    """
+    In-place sar_log10 -> clip_percentile -> normalize_percentile on a float buffer.
+    Every step writes back into `values`, so no per-step temporaries are allocated.
+    """
+    values *= scale_factor
+    np.maximum(values, LOG_EPS, out=values)
+    np.log10(values, out=values)
+    values *= 20.0
+    np.clip(values, low_percentile_val, high_percentile_val, out=values)
+    values -= low_percentile_val
+    values *= 255 / (high_percentile_val - low_percentile_val)
+    return values
+
 def sar_up_contrast_convert_to_uint8_pval(
     img_uint16: np.ndarray,
     low_percentile_val: float,
@@ -27,19 +183,29 @@ def sar_up_contrast_convert_to_uint8_pval(
     See https://support.capellaspace.com/scaling-geo-images-in-qgis 
     for more details on scaling process. 
     """
-    img = img_uint16.astype(np.float32)
-    valid = get_valid_mask(img, nodata=nodata) & (img > 0) & (img * scale_factor > LOG_EPS)
+    if img_uint16.dtype == np.uint16:
+        # the whole pipeline, valid mask included, is one table lookup per pixel
+        return _sar_pval_lut(low_percentile_val, high_percentile_val, scale_factor, nodata)[img_uint16]
 
-    out = np.zeros(img.shape, dtype=np.uint8)
+    valid = sar_valid_mask(img_uint16, nodata=nodata, scale_factor=scale_factor)
+
+    out = np.zeros(img_uint16.shape, dtype=np.uint8)
     if not np.any(valid):
         return out
 
-    img_db = clip_percentile(
-        sar_log10(img[valid], scale_factor),
-        low_percentile_val,
-        high_percentile_val,
-    )
-    out[valid] = normalize_percentile(img_db, low_percentile_val, high_percentile_val)
+    # Only the valid pixels are converted, and in cache-sized blocks: each block is
+    # cast into one reused float32 buffer, stretched in place and cast to uint8,
+    # so the float intermediates never make a full-size trip through RAM.
+    values = img_uint16[valid]
+    stretched = np.empty(values.shape, dtype=np.uint8)
+    buf = np.empty(min(values.size, _STRETCH_BLOCK), dtype=np.float32)
+    for start in range(0, values.size, _STRETCH_BLOCK):
+        stop = min(start + _STRETCH_BLOCK, values.size)
+        block = buf[:stop - start]
+        np.copyto(block, values[start:stop], casting="unsafe")
+        sar_db_stretch_inplace(block, low_percentile_val, high_percentile_val, scale_factor)
+        np.copyto(stretched[start:stop], block, casting="unsafe")
+    out[valid] = stretched
     return out
 
 def sar_up_contrast_convert_to_uint8_p(
@@ -49,20 +215,31 @@ def sar_up_contrast_convert_to_uint8_p(
     scale_factor: float = 1.0,
     nodata: float = 0.0,
 ) -> np.ndarray:
-    img = img_uint16.astype(np.float32)
+    if img_uint16.dtype == np.uint16:
+        # percentiles from a histogram of the raw values, then the whole stretch
+        # (valid mask included) as one uint8 table lookup per pixel
+        cdf = _uint16_valid_cdf(img_uint16, scale_factor, nodata)
+        if cdf[-1] == 0:
+            return np.zeros(img_uint16.shape, dtype=np.uint8)
+        lut_db = _sar_db_lut(scale_factor)
+        vmin, vmax = lut_db[_cdf_percentile_values(cdf, (low_percentile, high_percentile))]
+        valid = sar_valid_mask(_UINT16_VALUES, nodata=nodata, scale_factor=scale_factor)
+        values_db = np.clip(lut_db[valid], vmin, vmax)
+        lut = np.zeros(_UINT16_VALUES.shape, dtype=np.uint8)
+        lut[valid] = normalize_percentile(values_db, vmin, vmax)
+        return lut[img_uint16]
 
-    valid = get_valid_mask(img, nodata=nodata) & (img > 0)
-    out = np.zeros(img.shape, dtype=np.uint8)
+    valid = sar_valid_mask(img_uint16, nodata=nodata, scale_factor=scale_factor)
+    out = np.zeros(img_uint16.shape, dtype=np.uint8)
     if not np.any(valid):
         return out
 
-    img_db = sar_log10(img, scale_factor)
-
-    vmin, vmax = np.percentile(img_db[valid], (low_percentile, high_percentile))
-    img_db = clip_percentile(img_db, vmin, vmax)
-
-    img_db[valid] = normalize_percentile(img_db[valid], vmin, vmax)
-    return img_db.astype(np.uint8)
+    # work on the valid pixels only (1-D) and scatter back into a zeroed output
+    img_db = sar_log10(img_uint16[valid].astype(np.float32), scale_factor)
+    vmin, vmax = histogram_percentiles(img_db, (low_percentile, high_percentile)).astype(img_db.dtype)
+    np.clip(img_db, vmin, vmax, out=img_db)
+    out[valid] = normalize_percentile(img_db, vmin, vmax)
+    return out
 
 def sar_up_contrast_convert_uint8_p_ctx(
     img_uint16: np.ndarray,
@@ -97,34 +274,17 @@ def pad_to_square(
 ) -> np.ndarray:
     """
     Pad (H,W) or (C,H,W) to (patch_size,patch_size) (or (C,patch_size,patch_size)).
+    The output keeps the patch's dtype; it is filled with pad_value once and the patch
+    copied into its top-left corner (cheaper than np.pad for small edge patches).
     """
-    if patch.ndim == 2:
-        h, w = patch.shape
-    elif patch.ndim == 3:   
-        _, h, w = patch.shape
-    else:
+    if patch.ndim not in (2, 3):
         raise ValueError(f"Unsupported patch ndim={patch.ndim}")
-    
+    h, w = patch.shape[-2:]
+
     pad_h = max(0, patch_size - h)
     pad_w = max(0, patch_size - w)
-    if patch.ndim == 2:
-        h, w = patch.shape
-        if pad_h == 0 and pad_w == 0:
-            return patch
-        return np.pad(
-            patch,
-            ((0, pad_h), (0, pad_w)),
-            mode="constant",
-            constant_values=pad_value,
-        )
-    if patch.ndim == 3:
-        c, h, w = patch.shape
-        if pad_h == 0 and pad_w == 0:
-            return patch
-        return np.pad(
-            patch,
-            ((0, 0), (0, pad_h), (0, pad_w)),
-            mode="constant",
-            constant_values=pad_value,
-        )
-    raise ValueError(f"Unsupported patch ndim={patch.ndim}")
+    if pad_h == 0 and pad_w == 0:
+        return patch
+    out = np.full(patch.shape[:-2] + (h + pad_h, w + pad_w), pad_value, dtype=patch.dtype)
+    out[..., :h, :w] = patch
+    return out
@@ -20,6 +20,8 @@ def get_sat_tile_memory(height, width, dtype: np.dtype, n_channels, pow = 3) ->
     """
     return (height * width * np.dtype(dtype).itemsize * n_channels) / (1024 ** pow)
 
+_PROCESS = psutil.Process(os.getpid())
+
 def get_memory_mb() -> float:
     """
     Get the current memory usage of the process in megabytes.
@@ -27,12 +29,16 @@ def get_memory_mb() -> float:
     Returns:
         float: Memory usage in MB
     """
-    process = psutil.Process(os.getpid())
-    return process.memory_info().rss / (1024 * 1024)
+    global _PROCESS
+    if _PROCESS.pid != os.getpid():  # forked worker: re-bind to the child process
+        _PROCESS = psutil.Process(os.getpid())
+    return _PROCESS.memory_info().rss / (1024 * 1024)
 
-def make_dirs_if_not_exists(dir_path: str) -> None:
+def make_dirs_if_not_exists(dir_path: str | Path) -> None:
     """
     Create directories if they do not already exist.
+    Single mkdir call with exist_ok, so there is no exists/create race.
+    Call once per job, not inside per-tile or per-patch loops.
     
     Args:
         dir_path: Path to the directory to create
@@ -1,5 +1,6 @@
 import rasterio
 import numpy as np
+import pandas as pd
 from sat_img_utils.configs.ds_constants import (
     CAPELLA_BANDS, 
     CAPELLA_EXTRA_CTX, 
@@ -7,30 +8,34 @@ from sat_img_utils.configs.ds_constants import (
     CapellaPercentValue, 
     CapellaPolarization, 
 )
-from sat_img_utils.core.filters import min_land_fraction_filter_random, threshold_fraction_filter_eq
+from sat_img_utils.core.filters import min_land_fraction_filter_random, make_threshold_fraction_filter_eq
 from sat_img_utils.pipelines.config import PatchIterPipelineConfig
 from sat_img_utils.pipelines.context import Context
-from sat_img_utils.core.transforms import sar_up_contrast_convert_uint8_pval_ctx, sar_log10
+from sat_img_utils.core.transforms import sar_up_contrast_convert_uint8_pval_ctx, sar_db_percentiles
 
 from sat_img_utils.pipelines.patches import cut_patches, init_patch_config
 from sat_img_utils.geo.metadata import default_metadata_fn
 from sat_img_utils.geo.raster import choose_overview_level, get_overview
-from sat_img_utils.core.masks import get_valid_mask
-from sat_img_utils.configs.constants import LOG_EPS
 from sat_img_utils.configs import ds_constants
 
 from pathlib import Path
 import logging
 import json
 import os
+from functools import lru_cache
 from typing import Iterator, Tuple
 import time
 
 def _iter_capella_sar_paths_in_dir(parent: Path) -> Iterator[Tuple[Path, Path]]:
-    for dir_name in os.listdir(parent):
-        if "geo" in dir_name.lower() and "capella" in dir_name.lower():
-            base = parent / dir_name
-            yield base / f"{dir_name}.tif", base / f"{dir_name}_extended.json"
+    # scandir entries carry the file type from the directory listing, so skipping
+    # stray files needs no extra stat per name
+    with os.scandir(parent) as it:
+        for entry in it:
+            dir_name = entry.name
+            low = dir_name.lower()
+            if "capella" in low and "geo" in low and entry.is_dir():
+                base = parent / dir_name
+                yield base / f"{dir_name}.tif", base / f"{dir_name}_extended.json"
 
 
 def iter_capella_sar_paths(
@@ -51,52 +56,72 @@ def iter_capella_sar_paths(
     else:
         for year in ds_constants.CAPELLA_YEARS:
             year_dir = root / str(year)
-            if year_dir.exists():
+            if year_dir.is_dir():
                 yield from _iter_capella_sar_paths_in_dir(year_dir)
 
 
+@lru_cache(maxsize=256)
 def read_scale_factor_from_capella_metadata(path_to_metadata: str) -> float:
-    with open(path_to_metadata, 'r') as f:
+    """
+    Scale factor from a Capella extended metadata JSON. Cached per path: the extended
+    metadata (state vectors, processing history) is large and never changes, and
+    interactive reruns on the same tile would otherwise parse it every time.
+    """
+    with open(path_to_metadata, 'rb') as f:
         metadata = json.load(f)
-    return metadata['collect']['image']['scale_factor']    
+    return metadata['collect']['image']['scale_factor']
 
 
+# (low, high) stretch percentiles per polarization; co-pol entries come first so
+# they win when a name contains more than one polarization code
+_CAPELLA_PERCENTILES = {
+    CapellaPolarization.VV.value: (CapellaPercentValue.LO_HH_VV.value, CapellaPercentValue.HI_HH_VV.value),
+    CapellaPolarization.HH.value: (CapellaPercentValue.LO_HH_VV.value, CapellaPercentValue.HI_HH_VV.value),
+    CapellaPolarization.VH.value: (CapellaPercentValue.LO_HV_VH.value, CapellaPercentValue.HI_HV_VH.value),
+    CapellaPolarization.HV.value: (CapellaPercentValue.LO_HV_VH.value, CapellaPercentValue.HI_HV_VH.value),
+}
+
 def get_capella_percentiles(img_name: str) -> Tuple[float, float]:
-    if CapellaPolarization.VV.value in img_name or CapellaPolarization.HH.value in img_name:
-        return CapellaPercentValue.LO_HH_VV.value, CapellaPercentValue.HI_HH_VV.value
-    elif CapellaPolarization.VH.value in img_name or CapellaPolarization.HV.value in img_name:
-        return CapellaPercentValue.LO_HV_VH.value, CapellaPercentValue.HI_HV_VH.value
-    else:
-        raise ValueError(f"Unknown Capella polarization in image name: {img_name}")
+    for polarization, percentiles in _CAPELLA_PERCENTILES.items():
+        if polarization in img_name:
+            return percentiles
+    raise ValueError(f"Unknown Capella polarization in image name: {img_name}")
 
 
+# Fixed part of the patch GeoTIFF profile, built once. Patches are written
+# uncompressed: on SAR speckle ZSTD/DEFLATE (with or without predictor) only
+# shrink a 512x512 uint8 patch by ~2-8% while tripling write time.
+_CAPELLA_PATCH_PROFILE = {
+    'driver': 'GTiff',
+    'count': 1,
+    'dtype': 'uint8',
+}
+
 def save_capella_patch(patch, context: Context):
     """
     Save a SAR patch as a GeoTIFF file with appropriate georeferencing. Assumes patch is read
     from a window of a Capella SAR tile. All required parameters are provided via Context.
     Required context attributes: patch, sar_tile_window_transform, sar_tile_crs, sar_tile_name, i, j, out_dir, nodata (optional)
     """
+    p = context.patch  # resolved once; the fields below are read off the cached wrapper
+    patch_name = f"{context.img_name}_patch_{p.i}_{p.j}.tif"
     try:
-        patch_name = f"{context.img_name}_patch_{context.patch.i}_{context.patch.j}.tif"
         out_path = f"{context.out_dir}/{patch_name}"
         profile = {
-            'driver': 'GTiff',
-            'height': context.patch.height,
-            'width': context.patch.width,
-            'count': 1,
-            'dtype': 'uint8',
-            'crs': context.patch.src_crs,
-            'transform': context.patch.transform,
-            'nodata': context.nodata 
+            **_CAPELLA_PATCH_PROFILE,
+            'height': p.height,
+            'width': p.width,
+            'crs': p.src_crs,
+            'transform': p.transform,
+            'nodata': context.nodata,
         }
         with rasterio.open(out_path, 'w', **profile) as dst:
             dst.write(patch, 1)
         return 1
     except Exception as e:
-        logging.error(f"Error saving patch {context.img_name}_patch_{context.patch.i}_{context.patch.j}.tif: {e}")
+        logging.error(f"Error saving patch {patch_name}: {e}")
         return 0
 
-
 def init_capella_patch_config(
     patch_size: int,
     out_dir: str,
@@ -126,7 +151,7 @@ def gen_capella_tile_patches(
     patch_size: int = 512,
     nodata: int = 0,
     metadata_crs: int = 4326,
-) -> list[dict]:
+) -> pd.DataFrame:
     
     img_name = Path(ds.name).stem
     scale_factor = read_scale_factor_from_capella_metadata(extended_metadata_path)
@@ -140,10 +165,11 @@ def gen_capella_tile_patches(
     start = time.time()
     overview_level = choose_overview_level(ds, CAPELLA_OVERVIEW_TARGET_WIDTH)
     overview = get_overview(ds, CAPELLA_BANDS, overview_level)
-    valid = get_valid_mask(overview, nodata=nodata) & (overview > 0) & (overview > LOG_EPS)
-    overview_db = sar_log10(overview[valid], scale_factor)
     low_percentile, high_percentile = get_capella_percentiles(img_name)
-    low_percentile_val, high_percentile_val = np.percentile(overview_db, (low_percentile, high_percentile))
+    # histogram of the raw overview values: no valid mask or dB copy of the overview
+    low_percentile_val, high_percentile_val = sar_db_percentiles(
+        overview, (low_percentile, high_percentile), scale_factor=scale_factor, nodata=nodata
+    )
     end = time.time()
     logging.info(f"Time taken to get overview: {end - start:.2f} seconds")
     
@@ -153,6 +179,8 @@ def gen_capella_tile_patches(
     extra_ctx["sar_up_contrast_convert_uint8_pval_ctx"]["low_percentile_val"] = low_percentile_val
     extra_ctx["sar_up_contrast_convert_uint8_pval_ctx"]["high_percentile_val"] = high_percentile_val
 
+    eq_filter = make_threshold_fraction_filter_eq(**extra_ctx["threshold_fraction_filter_eq"])
+
     metadata = cut_patches(
         ds=ds,
         img_name=img_name,
@@ -161,11 +189,12 @@ def gen_capella_tile_patches(
         transform=sar_up_contrast_convert_uint8_pval_ctx,
         filters_before_transform=[
             min_land_fraction_filter_random,
-            threshold_fraction_filter_eq,
+            eq_filter,
         ],
         writer_fn=save_capella_patch,
         metadata_fn=default_metadata_fn,
         extra_ctx=extra_ctx,
+        prefetch=True,  # ds is opened from the tile's file path
     )
     return metadata    
 
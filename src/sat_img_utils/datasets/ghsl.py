@@ -1,16 +1,21 @@
-import gc
 import logging
-from typing import Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 import numpy as np
 import rasterio
+from rasterio.vrt import WarpedVRT
 from rasterio.windows import Window, from_bounds
-from rasterio.windows import transform as window_transform
-from rasterio.warp import reproject, Resampling, transform_bounds
+from rasterio.warp import Resampling, transform_geom
+from rasterio.features import geometry_mask
+import shapely
+from shapely.geometry import box, mapping, shape
 
 from sat_img_utils.configs import ds_constants
 from sat_img_utils.core import get_memory_mb
 from sat_img_utils.core.filters import calculate_threshold_fraction
-from sat_img_utils.geo import read_raster_window_chunked, reproject_raster_to_match
+from sat_img_utils.geo import read_raster_window_chunked
+from sat_img_utils.geo.raster import _default_warp_threads, reopen_dataset_reader
 
 def detect_buildings(
     ghsl: rasterio.DatasetReader,
@@ -19,12 +24,18 @@ def detect_buildings(
 ) -> float:
     """
     Detect buildings in a SAR image using GHSL (Global Human Settlement Layer) data.
-    Reads GHSL building density data, reprojects it to match the SAR
-    image geometry, and calculates the fraction of pixels indicating buildings.
+    Reads the GHSL subset under the SAR footprint and calculates the fraction of
+    GHSL pixels indicating buildings, counted on the native GHSL grid.
+
+    GHSL (~100m) is much coarser than SAR, so reprojecting it onto the SAR grid
+    only repeats each GHSL pixel many times before counting. Instead, GHSL pixels
+    whose centers fall inside the SAR footprint (reprojected into the GHSL CRS)
+    are counted once each. This matches the reprojected count up to edge pixels
+    and the area distortion between the two grids.
     
     Args:
         ghsl: Open GHSL raster dataset
-        sar: Open SAR raster dataset to match geometry
+        sar: Open SAR raster dataset whose footprint is used
         filter_value: Building detection threshold (default: from datasets.GHSL_BUILDINGS_THRESHOLD)
     
     Returns:
@@ -33,40 +44,34 @@ def detect_buildings(
     if filter_value is None:
         filter_value = ds_constants.GHSL_BUILDINGS_THRESHOLD
     
-    wgs84_bounds = transform_bounds(sar.crs, ghsl.crs, *sar.bounds)
     logging.info(f"Starting GHSL processing - Memory: {get_memory_mb():.0f}MB")
-    
-    window = from_bounds(*wgs84_bounds, ghsl.transform)
-    logging.info(f"After GHSL read - Memory: {get_memory_mb():.0f}MB")
-    
+    # densify the SAR bounds so the footprint edges stay accurate after reprojection
+    sar_box = box(*sar.bounds)
+    sar_box = shapely.segmentize(sar_box, max_segment_length=sar_box.length / 128)
+    footprint = transform_geom(sar.crs, ghsl.crs, mapping(sar_box))
+
+    window = from_bounds(*shape(footprint).bounds, ghsl.transform)
+    window = window.round_offsets().round_lengths()
     ghsl_subset = read_raster_window_chunked(ghsl, window)
-    
-    # Reproject GHSL to match SAR geometry
-    ghsl_resampled = reproject_raster_to_match(
-        source=ghsl_subset,
-        src_transform=ghsl.window_transform(window),
-        src_crs=ghsl.crs,
-        dst_shape=(sar.height, sar.width),
-        dst_transform=sar.transform,
-        dst_crs=sar.crs,
-        dtype=np.uint16,
-        resampling=Resampling.nearest
+    logging.info(f"After GHSL read - Memory: {get_memory_mb():.0f}MB")
+
+    inside = geometry_mask(
+        [footprint],
+        out_shape=ghsl_subset.shape,
+        transform=ghsl.window_transform(window),
+        invert=True,
     )
-    
-    del ghsl_subset
-    gc.collect()
-    
     building_fraction = calculate_threshold_fraction(
-        data=ghsl_resampled,
+        data=ghsl_subset,
         filter_value=filter_value,
         nodata=ghsl.nodata,
         greater=True,
-        strict=True
+        strict=True,
+        mask=inside,
     )
     
-    del ghsl_resampled
-    gc.collect()
-    
+    del ghsl_subset, inside
+
     return building_fraction
 
 def iter_windows(width: int, height: int, block: int):
@@ -81,68 +86,112 @@ def iter_windows(width: int, height: int, block: int):
                 height=h
             )
 
+def _count_ghsl_window(
+    vrt: WarpedVRT,
+    win: Window,
+    bufs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    filter_value: float,
+    nodata: Optional[float],
+) -> Tuple[int, int]:
+    """
+    (hits, total) for one SAR window of the warped GHSL. bufs are flat
+    (dst, hit, valid) buffers of at least the window size, reused across windows.
+    """
+    dst_buf, hit_buf, valid_buf = bufs
+    shape = (int(win.height), int(win.width))
+    n = shape[0] * shape[1]
+    dst = vrt.read(1, window=win, out=dst_buf[:n].reshape(shape))
+
+    # Valid mask: if GHSL has nodata defined, exclude it
+    hit = np.greater(dst, filter_value, out=hit_buf[:n].reshape(shape))
+    if nodata is None:
+        return int(np.count_nonzero(hit)), n
+    valid = np.not_equal(dst, nodata, out=valid_buf[:n].reshape(shape))
+    return int(np.count_nonzero(np.logical_and(hit, valid, out=hit))), int(np.count_nonzero(valid))
+
 def detect_buildings_chunked(
     ghsl: rasterio.DatasetReader,
     sar: rasterio.DatasetReader,
     filter_value: float = None,
     block: int = 4096,
+    max_workers: Optional[int] = None,
 ) -> float:
     """
     Memory-safe GHSL building fraction computation:
-    - read GHSL subset covering SAR bounds (chunked)
-    - reproject into SAR grid in small windows
-    - accumulate thresholded counts, never allocate full (H,W)
+    - warp GHSL onto the SAR grid through a WarpedVRT
+    - read the warped GHSL in small SAR windows (GDAL only fetches the source blocks each window needs)
+    - accumulate thresholded counts, never allocate full (H,W) or the full GHSL subset
+
+    Windows are processed by a thread pool (GDAL releases the GIL while reading
+    and warping). GDAL handles are not thread-safe, so every worker opens its own
+    GHSL reader and WarpedVRT and keeps its own window buffers. If ghsl can't be
+    reopened that way (see reopen_dataset_reader), windows are counted serially on ghsl.
+
+    Args:
+        max_workers: Number of worker threads (default: GDAL_NUM_THREADS, i.e. this
+            process's share of the CPUs, else all CPUs; capped at 8); 1 runs serially
     """
     if filter_value is None:
         filter_value = ds_constants.GHSL_BUILDINGS_THRESHOLD
+    if max_workers is None:
+        max_workers = min(_default_warp_threads(), 8)
 
-    # Bounds of SAR in GHSL CRS
-    ghsl_bounds = transform_bounds(sar.crs, ghsl.crs, *sar.bounds)
     logging.info(f"Starting GHSL processing - Memory: {get_memory_mb():.0f}MB")
 
-    # Window in GHSL that covers SAR footprint
-    ghsl_window = from_bounds(*ghsl_bounds, transform=ghsl.transform)
-
-    # Read GHSL subset (your chunked reader)
-    ghsl_subset = read_raster_window_chunked(ghsl, ghsl_window)
-    src_transform = ghsl.window_transform(ghsl_window)
-
-    logging.info(
-        f"GHSL subset shape={ghsl_subset.shape}, dtype={ghsl_subset.dtype}, "
-        f"Memory: {get_memory_mb():.0f}MB"
+    vrt_kwargs = dict(
+        crs=sar.crs,
+        transform=sar.transform,
+        width=sar.width,
+        height=sar.height,
+        resampling=Resampling.nearest,
+        nodata=ghsl.nodata,
     )
+    buf_size = min(block, sar.height) * min(block, sar.width)
+    windows = list(iter_windows(sar.width, sar.height, block))
 
-    # Accumulators
-    total = 0
-    hits = 0
-
-    # Reproject in SAR windows
-    for win in iter_windows(sar.width, sar.height, block):
-        dst = np.zeros((int(win.height), int(win.width)), dtype=np.uint16)
-
-        reproject(
-            source=ghsl_subset,
-            destination=dst,
-            src_transform=src_transform,
-            src_crs=ghsl.crs,
-            dst_transform=window_transform(win, sar.transform),
-            dst_crs=sar.crs,
-            resampling=Resampling.nearest,
-        )
-
-        # Valid mask: if GHSL has nodata defined, exclude it
-        if ghsl.nodata is not None:
-            valid = (dst != ghsl.nodata)
-            total += int(valid.sum())
-            hits += int(((dst > filter_value) & valid).sum())
+    if max_workers > 1:
+        probe = reopen_dataset_reader(ghsl)
+        if probe is None:
+            logging.info(f"Cannot reopen {ghsl.name} per thread; counting GHSL windows serially")
+            max_workers = 1
         else:
-            total += dst.size
-            hits += int((dst > filter_value).sum())
+            probe.close()
+
+    local = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+
+    def _worker(win: Window) -> Tuple[int, int]:
+        if not hasattr(local, "vrt"):
+            # the serial path reads ghsl itself; threads each need their own handle
+            src = ghsl if max_workers <= 1 else reopen_dataset_reader(ghsl)
+            if src is None:
+                raise RuntimeError(f"Failed to reopen {ghsl.name} for a GHSL worker thread")
+            local.vrt = WarpedVRT(src, **vrt_kwargs)
+            local.bufs = (
+                np.empty(buf_size, dtype=ghsl.dtypes[0]),
+                np.empty(buf_size, dtype=bool),
+                np.empty(buf_size, dtype=bool),
+            )
+            with opened_lock:
+                opened.append((local.vrt, src))
+        return _count_ghsl_window(local.vrt, win, local.bufs, filter_value, ghsl.nodata)
+
+    try:
+        # rasterio passes an integer GDAL_CACHEMAX to GDALSetCacheMax, i.e. in bytes
+        with rasterio.Env(GDAL_CACHEMAX=ds_constants.GHSL_GDAL_CACHEMAX_MB * 1024 * 1024):
+            if max_workers <= 1:
+                counts = [_worker(win) for win in windows]
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    counts = list(pool.map(_worker, windows))
+    finally:
+        for vrt, src in opened:
+            vrt.close()
+            if src is not ghsl:
+                src.close()
 
-        # free window buffer promptly
-        del dst
-        
-    del ghsl_subset
-    gc.collect()
+    hits = sum(win_hits for win_hits, _ in counts)
+    total = sum(win_total for _, win_total in counts)
 
-    return 0.0 if total == 0 else hits / total
\ No newline at end of file
+    return 0.0 if total == 0 else hits / total
@@ -1,21 +1,37 @@
 import logging
+import os
 import numpy as np
 import geopandas as gpd
 import rasterio
 from rasterio.warp import reproject, Resampling, transform_bounds
 from rasterio.windows import from_bounds as window_from_bounds
-from sat_img_utils.geo.raster import drop_null_empty_invalid, clean_gdf, rasterize_gdf_to_mask
+from sat_img_utils.geo.raster import drop_null_empty_invalid, clean_gdf, rasterize_gdf_to_mask, select_tile_candidates
+
+# Set SAT_IMG_UTILS_DEBUG_VRT=1 to diagnose tiles without VRT coverage with an
+# extra direct VRT read (skipped by default: tiles off the VRT are expected)
+_DEBUG_VRT_COVERAGE = os.environ.get("SAT_IMG_UTILS_DEBUG_VRT", "0") == "1"
 
 class LandMaskVRT:
     """
     VRT file containing a single band of the land mask.
     Allows for efficient rasterization of the land mask to a satellite tile.
+    The VRT (which may list thousands of sources) is opened on first use, so runs
+    where no tile passes the earlier filters never open it.
     """
     def __init__(self, vrt_path: str):
-        self.ds = rasterio.open(vrt_path)
+        self.vrt_path = vrt_path
+        self._ds = None
+
+    @property
+    def ds(self) -> rasterio.io.DatasetReader:
+        if self._ds is None:
+            self._ds = rasterio.open(self.vrt_path)
+        return self._ds
 
     def close(self):
-        self.ds.close()
+        if self._ds is not None:
+            self._ds.close()
+            self._ds = None
 
     def get_mask_for_tile(self, sat_tile: rasterio.io.DatasetReader) -> np.ndarray:
         """
@@ -38,7 +54,12 @@ class LandMaskVRT:
             resampling=Resampling.nearest,
         )
 
-        if (dst == MASK_NODATA).all():
+        # MASK_NODATA is the uint8 maximum, so "all nodata" is just min == 255:
+        # one reduction pass, no (H, W) bool temporary
+        if dst.min() == MASK_NODATA:
+            if not _DEBUG_VRT_COVERAGE:
+                logging.warning(f"VRT has no reprojected coverage for {sat_tile.name}.")
+                return dst
             # VRT has no coverage. Read the window directly in the VRT's own CRS
             # to distinguish a CRS/transform bug from genuinely missing tile data.
             sat_in_vrt_crs = transform_bounds(sat_tile.crs, self.ds.crs, *sat_tile.bounds)
@@ -56,7 +77,9 @@ class LandMaskVRT:
         return dst
 
 def osm_rasterize_sat_land_mask(land_global: gpd.GeoDataFrame, sat_tile: rasterio.io.DatasetReader) -> np.ndarray:
-    land_global = drop_null_empty_invalid(land_global)
-    land_global = clean_gdf(land_global)
-    land_mask = rasterize_gdf_to_mask(land_global, sat_tile=sat_tile)
+    # only polygons near the tile need validity checks, repair and reprojection
+    land = select_tile_candidates(land_global, sat_tile)
+    land = drop_null_empty_invalid(land)
+    land = clean_gdf(land)
+    land_mask = rasterize_gdf_to_mask(land, sat_tile=sat_tile, prefiltered=True)
     return land_mask
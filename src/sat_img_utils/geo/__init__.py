@@ -5,6 +5,7 @@ from .metadata import *
 
 __all__ = [
     "estimate_window_size_gb",
+    "iter_row_windows",
     "read_raster_window_chunked",
     "reproject_raster_to_match",
 ]
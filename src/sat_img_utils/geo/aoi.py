@@ -1,39 +1,82 @@
 import os
 import geopandas as gpd
+import pyogrio
+import shapely
 from sat_img_utils.core.utils import make_dirs_if_not_exists
 import logging
 from pathlib import Path
 from sat_img_utils.geo.raster import clean_gdf
 from sat_img_utils.configs.constants import CRS
 
+def _to_crs_if_needed(gdf: gpd.GeoDataFrame, epsg: int) -> gpd.GeoDataFrame:
+    """
+    Reproject only when the frame is not already in the target CRS.
+    """
+    if gdf.crs is not None and gdf.crs == epsg:
+        return gdf
+    return gdf.to_crs(epsg)
+
 def split_aoi(aoi: gpd.GeoDataFrame, 
               out_dir: str, 
               out_crs: CRS = CRS.WEB_MERCATOR,
-              prefix: str = "aoi"):
+              prefix: str = "aoi",
+              single_file: bool = False):
     """
     Split an AOI into parts and save each part as a separate GeoJSON file.
     Generally used for AOIs that are MultiPolygon geometries.
+
+    If single_file is True, all parts are written in one call to a single
+    FlatGeobuf file ({prefix}_parts_{crs}.fgb), as in explode_aoi_to_files.
     """
     make_dirs_if_not_exists(out_dir)
     crs = int(out_crs)
-    aoi_crs = aoi.to_crs(crs)
-    for i in range(len(aoi_crs)):
+    aoi_crs = _to_crs_if_needed(aoi, crs)
+    geoms = aoi_crs.geometry.values
+    # build the output frame once; per-part files are row slices of it
+    parts = gpd.GeoDataFrame({"id": range(len(geoms))}, geometry=geoms, crs=aoi_crs.crs)
+
+    if single_file:
+        out_path = os.path.join(out_dir, f"{prefix}_parts_{crs}.fgb")
+        pyogrio.write_dataframe(parts, out_path, driver="FlatGeobuf")
+        logging.info(f"Wrote {len(parts)} AOI parts -> {out_path}")
+        return
+
+    for i in range(len(parts)):
         out_path = os.path.join(out_dir, f"{prefix}_{i:02d}_{crs}.geojson")
-        gpd.GeoDataFrame({"id":[i]}, geometry=[aoi_crs.geometry.iloc[i]], crs=crs).to_file(
-            out_path, driver="GeoJSON"
-        )
-    logging.info(f"Wrote {len(aoi_crs)} AOI parts to {out_dir}/")
+        pyogrio.write_dataframe(parts.iloc[i:i + 1], out_path, driver="GeoJSON")
+    logging.info(f"Wrote {len(parts)} AOI parts to {out_dir}/")
+
+def _explode_parts(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+    Split multi-part geometries into single parts with one vectorized
+    shapely.get_parts call. Attributes are repeated for every part and the
+    result gets a fresh RangeIndex (same as explode(index_parts=False, ignore_index=True)).
+    """
+    geoms, src_idx = shapely.get_parts(gdf.geometry.values, return_index=True)
+    parts = gdf.iloc[src_idx].reset_index(drop=True)
+    parts[gdf.geometry.name] = gpd.GeoSeries(geoms, index=parts.index, crs=gdf.crs)
+    return parts
 
 def explode_aoi_to_files(
     in_geojson: str,
     out_dir: str,
     out_crs: CRS = CRS.WEB_MERCATOR,
     prefix="aoi",
+    single_file: bool = False,
+    batch_size: int = 5000,
 ):
     """
     Explode an AOI into parts and save each part as a separate GeoJSON file.
     Generally used for AOIs that are MultiPolygon geometries.
 
+    If single_file is True, all parts are written to a single FlatGeobuf file
+    ({prefix}_parts_{crs}.fgb) instead. Unlike GeoJSONSeq (always WGS84), it keeps
+    out_crs, and its spatial index lets downstream readers fetch parts by bbox.
+
+    Input features are streamed batch_size at a time from one open reader (read,
+    reproject, explode, clean, write), so only one batch of parts is held in memory
+    and the input is parsed once.
+
     Example usage: 
     explode_aoi_to_files(
         in_geojson="aoi_geojsons/osm_aoi_capella_def.geojson",
@@ -45,19 +88,39 @@ def explode_aoi_to_files(
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    gdf = gpd.read_file(in_geojson)
-    
     crs_int = int(out_crs)
-    if out_crs is not None:
-        gdf = gdf.to_crs(crs_int)
+    single_path = os.path.join(out_dir, f"{prefix}_parts_{crs_int}.fgb")
 
-    parts = gdf.explode(index_parts=False, ignore_index=True)
+    n_exploded = 0  # parts seen so far, keeps file numbering global across batches
+    n_written = 0
+    # One Arrow stream over the input: reopening it per batch (skip_features) would
+    # make the driver re-parse the whole document for every batch.
+    with pyogrio.open_arrow(in_geojson, batch_size=batch_size, use_pyarrow=True) as (_, reader):
+        for batch in reader:
+            gdf = gpd.GeoDataFrame.from_arrow(batch)
+            gdf = gdf.rename_geometry("geometry")
+            if out_crs is not None:
+                gdf = _to_crs_if_needed(gdf, crs_int)
 
-    parts = clean_gdf(parts)
+            parts = _explode_parts(gdf)
+            parts.index += n_exploded
+            n_exploded += len(parts)
+            parts = clean_gdf(parts)
+            if parts.empty:
+                continue
 
-    for i, row in parts.iterrows():
-        one = gpd.GeoDataFrame([row], crs=parts.crs)
-        out_path = os.path.join(out_dir, f"{prefix}_{i:02d}_{crs_int}.geojson")
-        one.to_file(out_path, driver="GeoJSON")
+            if single_file:
+                # A FlatGeobuf layer takes its geometry type from the first write, and
+                # make_valid can turn a later batch's parts into MultiPolygons: write
+                # every batch as multi so the appended batches always match.
+                pyogrio.write_dataframe(
+                    parts, single_path, driver="FlatGeobuf", append=n_written > 0, promote_to_multi=True
+                )
+            else:
+                # one-row positional slice of the batch frame (a small new GeoDataFrame per part)
+                for pos, i in enumerate(parts.index):
+                    out_path = os.path.join(out_dir, f"{prefix}_{i:02d}_{crs_int}.geojson")
+                    pyogrio.write_dataframe(parts.iloc[pos:pos + 1], out_path, driver="GeoJSON")
+            n_written += len(parts)
 
-    logging.info(f"Wrote {len(parts)} AOI parts -> {out_dir}")
\ No newline at end of file
+    logging.info(f"Wrote {n_written} AOI parts -> {single_path if single_file else out_dir}")
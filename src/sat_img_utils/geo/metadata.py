@@ -1,6 +1,8 @@
 import os
+import json
 import rasterio
-from shapely.geometry import Point
+import pandas as pd
+import shapely
 import geopandas as gpd
 from sat_img_utils.core.utils import make_dirs_if_not_exists
 from sat_img_utils.pipelines.context import Context
@@ -10,21 +12,80 @@ import logging
 def default_metadata_fn(ctx: Context):
     """
     Default metadata function to record patch name and center longitude/latitude.
+    The center is kept as flat scalars; list_dict_to_parquet builds the point geometry.
     """
     return {
         "img_name": ctx.img_name,
         "patch_name": ctx.patch.patch_name,
-        "geometry": Point(ctx.patch.long_center, ctx.patch.lat_center), 
+        "long_center": ctx.patch.long_center,
+        "lat_center": ctx.patch.lat_center,
         "crs": f"EPSG:{ctx.metadata_crs}",
-    } 
+    }
 
 def list_dict_to_parquet(
-    metadata_list: list[dict],
+    metadata_list: list[dict] | pd.DataFrame,
     out_path: str,
     crs: int = 4326,
 ):
     """
-    Save a list of metadata dictionaries to a Parquet file.
+    Save patch metadata to a Parquet file: the DataFrame cut_patches returns, or a
+    list of metadata dictionaries.
+    Records with `long_center` / `lat_center` fields (see default_metadata_fn) get their
+    point geometry built in one vectorized call; records that already carry a
+    `geometry` are written as-is.
     """
-    gdf = gpd.GeoDataFrame(metadata_list, crs=f'EPSG:{crs}')
-    gdf.to_parquet(out_path)
+    df = pd.DataFrame(metadata_list)
+    if "geometry" not in df.columns and {"long_center", "lat_center"} <= set(df.columns):
+        geometry = shapely.points(df["long_center"].to_numpy(), df["lat_center"].to_numpy())
+        df = df.drop(columns=["long_center", "lat_center"])
+        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs=f'EPSG:{crs}')
+    else:
+        gdf = gpd.GeoDataFrame(df, crs=f'EPSG:{crs}')
+    # bbox covering column lets readers filter with gpd.read_parquet(bbox=...)
+    gdf.to_parquet(out_path, write_covering_bbox=True)
+
+def merge_parquet_files(paths: list[str], out_path: str) -> int:
+    """
+    Concatenate (Geo)Parquet files with the same columns into out_path and return the
+    number of rows written. Files are streamed as record batches through a pyarrow
+    dataset scanner, which reads ahead on its own thread pool; geometries stay WKB
+    and only a few batches are in memory at a time. The GeoParquet
+    metadata of the first file is kept, with the bbox widened to cover all inputs.
+    pyarrow is the Parquet engine geopandas already requires for to_parquet.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+
+    schemas = [pq.read_schema(p) for p in paths]
+    schema = pa.unify_schemas([s.remove_metadata() for s in schemas])
+
+    metadata = dict(schemas[0].metadata or {})
+    # per-file pandas index metadata doesn't describe the merged table
+    metadata.pop(b"pandas", None)
+    if b"geo" in metadata:
+        geo = json.loads(metadata[b"geo"])
+        for name, col in geo.get("columns", {}).items():
+            bboxes = []
+            for s in schemas:
+                file_geo = json.loads((s.metadata or {}).get(b"geo", b"{}"))
+                bboxes.append(file_geo.get("columns", {}).get(name, {}).get("bbox"))
+            if all(bboxes):
+                col["bbox"] = [
+                    min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+                    max(b[2] for b in bboxes), max(b[3] for b in bboxes),
+                ]
+            else:
+                col.pop("bbox", None)
+        metadata[b"geo"] = json.dumps(geo).encode()
+    schema = schema.with_metadata(metadata)
+
+    # batches come back in path order, cast to the unified schema
+    dataset = pads.dataset(paths, schema=schema, format="parquet")
+    n_rows = 0
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for batch in dataset.to_batches(use_threads=True):
+            if batch.num_rows:
+                writer.write_batch(batch)
+                n_rows += batch.num_rows
+    return n_rows
@@ -1,8 +1,9 @@
 """Raster data reading and reprojection utilities."""
 
 import logging
-import gc
-from typing import Tuple
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
 from pyproj import Transformer
 import geopandas as gpd
 import rasterio
@@ -10,13 +11,14 @@ from rasterio.features import rasterize
 from rasterio.windows import Window, from_bounds
 from rasterio.warp import reproject, Resampling, transform_bounds, transform
 import numpy as np
+import shapely
 from shapely.geometry import box
-from shapely.ops import unary_union
 
 from sat_img_utils.configs import constants
 from sat_img_utils.core import get_memory_mb
 from typing import Union, Sequence
 
+
 def estimate_window_size_gb(window: Window, dtype_bytes: int = 2) -> float:
     """
     Estimate the memory size of a raster window in gigabytes.
@@ -30,6 +32,71 @@ def estimate_window_size_gb(window: Window, dtype_bytes: int = 2) -> float:
     """
     return (window.width * window.height * dtype_bytes) / (1024 * 1024 * 1024)
 
+def iter_row_windows(
+    raster: rasterio.DatasetReader,
+    window: Window = None,
+    max_size_gb: float = None,
+    max_rows: int = None,
+    band_count: int = 1,
+):
+    """
+    Yield full-width row strips covering `window` (default: the whole raster),
+    each at most max_size_gb in memory and at most max_rows tall.
+
+    Strip boundaries are snapped to the raster's internal block rows, so no
+    GeoTIFF block is decompressed by two different strips.
+
+    Args:
+        raster: Open rasterio dataset reader
+        window: Window to cover (default: full raster)
+        max_size_gb: Memory budget per strip in GB (default: from constants)
+        max_rows: Optional cap on rows per strip (e.g. constants.CHUNK_HEIGHT)
+        band_count: Number of bands that will be read per strip
+    """
+    if window is None:
+        window = Window(0, 0, raster.width, raster.height)
+    if max_size_gb is None:
+        max_size_gb = constants.MAX_WINDOW_SIZE_GB
+    col_off, row_off = int(round(window.col_off)), int(round(window.row_off))
+    width, height = int(round(window.width)), int(round(window.height))
+
+    bytes_per_row = width * np.dtype(raster.dtypes[0]).itemsize * band_count
+    rows = max(1, int(max_size_gb * 1024 ** 3 // max(bytes_per_row, 1)))
+    if max_rows is not None:
+        rows = max(1, min(rows, max_rows))
+    block_h = raster.block_shapes[0][0]
+
+    row, end = row_off, row_off + height
+    while row < end:
+        stop = row + rows
+        aligned = stop - stop % block_h
+        if aligned > row:
+            stop = aligned
+        stop = min(stop, end)
+        yield Window(col_off, row, width, stop - row)
+        row = stop
+
+def reopen_dataset_reader(ds: rasterio.DatasetReader) -> Optional[rasterio.DatasetReader]:
+    """
+    Open a second, independent handle on the file behind ds (e.g. for another thread,
+    since a GDAL dataset must not be shared between threads). Returns None when ds
+    cannot be reproduced by reopening its name: WarpedVRTs and other non-plain
+    readers, in-memory (/vsimem/) datasets, a failed open, or a reopened dataset
+    whose shape, bands, dtypes, CRS or transform differ from ds.
+    """
+    if type(ds) is not rasterio.io.DatasetReader or ds.name.startswith("/vsimem/"):
+        return None
+    try:
+        reader = rasterio.open(ds.name, driver=ds.driver, **(ds.options or {}))
+    except (rasterio.errors.RasterioError, OSError, TypeError):
+        return None
+    if (reader.shape, reader.count, reader.dtypes, reader.crs, reader.transform) != (
+        ds.shape, ds.count, ds.dtypes, ds.crs, ds.transform
+    ):
+        reader.close()
+        return None
+    return reader
+
 def choose_overview_level(ds: rasterio.DatasetReader, target_w: int) -> int:
     """
     Return the index into ds.overviews(1) whose width is <= target_w,
@@ -66,15 +133,39 @@ def get_overview(
         return ds.read(bands, out_shape=(out_h, out_w))
     return ds.read(list(bands), out_shape=(len(bands), out_h, out_w))
 
+def read_overview_for_width(
+    ds: rasterio.DatasetReader,
+    bands: Union[int, Sequence[int]],
+    target_w: int,
+) -> np.ndarray:
+    """
+    Read a raster reduced to a width of about target_w in one call.
+
+    With overviews this is get_overview at choose_overview_level. Without them,
+    GDAL decimates the full-resolution band on read (nearest), so no full-size
+    array is materialized.
+    """
+    overview_level = choose_overview_level(ds, target_w)
+    if overview_level is not None or ds.width <= target_w:
+        return get_overview(ds, bands, overview_level)
+    factor = -(-ds.width // target_w)
+    out_h = max(1, ds.height // factor)
+    out_w = max(1, ds.width // factor)
+    if isinstance(bands, int):
+        return ds.read(bands, out_shape=(out_h, out_w))
+    return ds.read(list(bands), out_shape=(len(bands), out_h, out_w))
+
 def read_raster_window_chunked(
     raster: rasterio.DatasetReader,
     window: Window,
     band: int = 1,
     max_size_gb: float = None,
-    chunk_height: int = None
+    chunk_height: int = None,
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Read a raster window in chunks to avoid memory issues with large windows.
+    Chunks are read straight into the rows of one (height, width) result array.
     
     Args:
         raster: Open rasterio dataset reader
@@ -82,43 +173,61 @@ def read_raster_window_chunked(
         band: Band number to read (default: 1)
         max_size_gb: Maximum window size in GB before chunking (default: from constants)
         chunk_height: Height of each chunk in rows (default: from constants)
+        out: Optional preallocated (height, width) array of the band's dtype to read
+             into, e.g. a buffer reused across windows of the same size
     
     Returns:
-        np.ndarray: Array containing the windowed raster data
+        np.ndarray: Array containing the windowed raster data (`out` if given)
     """
     if max_size_gb is None:
         max_size_gb = constants.MAX_WINDOW_SIZE_GB
     if chunk_height is None:
         chunk_height = constants.CHUNK_HEIGHT
     
-    window_size_gb = estimate_window_size_gb(window)
+    dtype_bytes = np.dtype(raster.dtypes[band - 1]).itemsize
+    window_size_gb = estimate_window_size_gb(window, dtype_bytes=dtype_bytes)
     logging.info(f"Estimated window size: {window_size_gb:.2f}GB")
     
     if window_size_gb > max_size_gb:
         logging.info("Large window detected - reading in chunks")
-        chunks = []
-        
-        for row_start in range(0, window.height, chunk_height):
-            chunk_window = Window(
-                window.col_off, 
-                window.row_off + row_start,
-                window.width,
-                min(chunk_height, window.height - row_start)
+        # read every strip straight into its rows of the output: no chunk list
+        # and no vstack copy, so peak memory is the result itself
+        if out is None:
+            out = np.empty(
+                (int(round(window.height)), int(round(window.width))),
+                dtype=raster.dtypes[band - 1],
             )
-            
+        result = out
+        row_off = int(round(window.row_off))
+        
+        # block-aligned strips of at most chunk_height rows
+        for chunk_window in iter_row_windows(raster, window, max_size_gb=max_size_gb, max_rows=chunk_height):
+            start = chunk_window.row_off - row_off
+            stop = start + chunk_window.height
             logging.info(
-                f"Reading chunk at row {row_start}/{window.height} - "
+                f"Reading chunk at row {start}/{result.shape[0]} - "
                 f"Memory: {get_memory_mb():.0f}MB"
             )
-            chunk = raster.read(band, window=chunk_window)
-            chunks.append(chunk)
-        
-        result = np.vstack(chunks)
-        del chunks
-        gc.collect()
+            raster.read(band, window=chunk_window, out=result[start:stop])
         return result
     else:
-        return raster.read(band, window=window)
+        return raster.read(band, window=window, out=out)
+
+def _default_warp_threads() -> int:
+    """
+    GDAL_NUM_THREADS of the active rasterio Env (e.g. the per-process CPU split set
+    by generate_capella_patches' _gdal_env) or the process environment; all CPUs if
+    unset. Falling back to os.cpu_count() unconditionally would oversubscribe the
+    machine cpu_count-fold when called from parallel worker processes.
+    """
+    value = rasterio.env.getenv().get("GDAL_NUM_THREADS") if rasterio.env.hasenv() else None
+    value = str(value or os.environ.get("GDAL_NUM_THREADS") or "ALL_CPUS")
+    if value.upper() == "ALL_CPUS":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 1
 
 def reproject_raster_to_match(
     source: np.ndarray,
@@ -128,7 +237,9 @@ def reproject_raster_to_match(
     dst_transform,
     dst_crs,
     dtype: np.dtype = np.uint16,
-    resampling: Resampling = Resampling.nearest
+    resampling: Resampling = Resampling.nearest,
+    num_threads: Optional[int] = None,
+    warp_mem_limit: int = constants.WARP_MEM_LIMIT_MB,
 ) -> np.ndarray:
     """
     Reproject a raster array to match the geometry of another raster.
@@ -139,6 +250,9 @@ def reproject_raster_to_match(
     2. Where that location maps to in the source CRS
     3. Which pixels cover that location
     4. How to interpolate those pixels to get a value for the new pixel
+    Step 2 is not run through PROJ for every pixel: GDAL's approximate transformer
+    (which rasterio always sets up, with a 0.125 pixel error threshold) projects a
+    sparse grid of points and interpolates linearly between them.
     
     Args:
         source: Source array to reproject
@@ -149,6 +263,9 @@ def reproject_raster_to_match(
         dst_crs: CRS of the destination array
         dtype: Data type for the destination array
         resampling: Resampling method to use
+        num_threads: Number of GDAL warp worker threads (default: GDAL_NUM_THREADS
+                     from the active rasterio Env or environment, else all CPUs)
+        warp_mem_limit: GDAL warp working memory in MB (default: from constants)
     
     Returns:
         np.ndarray: Reprojected array matching destination geometry
@@ -162,12 +279,34 @@ def reproject_raster_to_match(
         src_crs=src_crs,
         dst_transform=dst_transform,
         dst_crs=dst_crs,
-        resampling=resampling
+        resampling=resampling,
+        num_threads=num_threads or _default_warp_threads(),
+        warp_mem_limit=warp_mem_limit,
+        # destination is already zero-filled
+        init_dest_nodata=False,
     )
     
     logging.info(f"After reprojection - Memory: {get_memory_mb():.0f}MB")
     return destination
 
+@lru_cache(maxsize=64)
+def _get_transformer(src_crs_wkt: str, out_epsg: int) -> Optional[Transformer]:
+    """
+    Transformer from src_crs_wkt to EPSG:out_epsg, or None if they are the same CRS.
+    Cached: building a Transformer (and resolving the EPSG code) hits the PROJ database.
+    """
+    src_crs = rasterio.crs.CRS.from_wkt(src_crs_wkt)
+    if src_crs.to_epsg() == out_epsg:
+        return None
+    return Transformer.from_crs(src_crs, f"EPSG:{out_epsg}", always_xy=True)
+
+@lru_cache(maxsize=64)
+def _get_epsg_transformer(src_epsg: int, dst_epsg: int) -> Transformer:
+    """
+    Transformer between two EPSG codes, cached per pair (see _get_transformer).
+    """
+    return Transformer.from_crs(f"EPSG:{src_epsg}", f"EPSG:{dst_epsg}", always_xy=True)
+
 def window_center_longlat(
     ds: rasterio.io.DatasetReader,
     window: Window,
@@ -181,85 +320,178 @@ def window_center_longlat(
 
     x_center, y_center = rasterio.transform.xy(ds.transform, center_row, center_col, offset="center")
 
-    if ds.crs is None or ds.crs.to_epsg() == out_epsg:
+    if ds.crs is None:
+        return float(x_center), float(y_center)
+    transformer = _get_transformer(ds.crs.to_wkt(), out_epsg)
+    if transformer is None:
         return float(x_center), float(y_center)
 
-    transformer = Transformer.from_crs(ds.crs, f"EPSG:{out_epsg}", always_xy=True)
     long, lat = transformer.transform(x_center, y_center)
     return float(long), float(lat)
 
+def window_centers_longlat(
+    ds: rasterio.io.DatasetReader,
+    windows: Sequence[Window],
+    out_epsg: int = 4326,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized window_center_longlat: returns (long, lat) arrays of the window centers,
+    mapped through the affine transform with plain NumPy arithmetic and converted with
+    one Transformer.transform call.
+    """
+    # pixel-center convention of rasterio.transform.xy(..., offset="center")
+    center_rows = np.array([w.row_off + w.height / 2.0 for w in windows], dtype=np.float64) + 0.5
+    center_cols = np.array([w.col_off + w.width / 2.0 for w in windows], dtype=np.float64) + 0.5
+
+    a, b, c, d, e, f = ds.transform[:6]
+    x_center = a * center_cols + b * center_rows + c
+    y_center = d * center_cols + e * center_rows + f
+
+    if ds.crs is None:
+        return x_center, y_center
+    transformer = _get_transformer(ds.crs.to_wkt(), out_epsg)
+    if transformer is None:
+        return x_center, y_center
+
+    long, lat = transformer.transform(x_center, y_center)
+    return np.asarray(long, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
 def drop_null_empty_invalid(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:   
-    gdf = gdf[gdf.geometry.notnull()]
-    gdf = gdf[~gdf.geometry.is_empty]
-    gdf = gdf[gdf.is_valid]
-    return gdf
+    """
+    Drop rows with missing, empty or invalid geometries, using one combined mask
+    from vectorized shapely predicates and a single row selection.
+    Works on both GeoDataFrames and GeoSeries. When no row is dropped the input
+    is returned as-is rather than copied.
+    """
+    geoms = np.asarray(gdf.geometry.values)
+    # is_valid is False for missing geometries, so it also covers the null check
+    keep = shapely.is_valid(geoms)
+    np.logical_and(keep, ~shapely.is_empty(geoms), out=keep)
+    if keep.all():
+        return gdf
+    return gdf.iloc[np.flatnonzero(keep)]
 
 def clean_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """
-    Apply zero-width buffer to clean invalid geometries in a GeoDataFrame.
+    Repair invalid geometries in a GeoDataFrame with a vectorized make_valid.
+    The "structure" method keeps polygonal inputs polygonal (like buffer(0)) but
+    does not silently drop parts of self-intersecting rings.
+    Only the invalid rows are passed to make_valid; valid geometries (the vast
+    majority of OSM land polygons) are left untouched, and afterwards only the
+    repaired rows are re-checked before null/empty/invalid rows are dropped.
     """
-    gdf["geometry"] = gdf["geometry"].buffer(0)
-    return drop_null_empty_invalid(gdf)
-
-def get_gdf(gdf_path: str) -> gpd.GeoDataFrame:
+    geoms = np.asarray(gdf.geometry.values)
+    # is_valid is False for missing geometries, so `valid` also marks them for dropping
+    valid = shapely.is_valid(geoms)
+    invalid = ~valid & ~shapely.is_missing(geoms)
+    if invalid.any():
+        geoms = geoms.copy()
+        repaired = shapely.make_valid(geoms[invalid], method="structure", keep_collapsed=False)
+        geoms[invalid] = repaired
+        valid[invalid] = shapely.is_valid(repaired)
+        gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+
+    keep = valid
+    np.logical_and(keep, ~shapely.is_empty(geoms), out=keep)
+    if keep.all():
+        return gdf
+    return gdf.iloc[np.flatnonzero(keep)]
+
+def get_gdf(gdf_path: str, bbox: Optional[Tuple[float, float, float, float]] = None) -> gpd.GeoDataFrame:
     """
-    Read a GeoDataFrame from a file and clean it by dropping null, empty, and invalid geometries.
+    Read a GeoDataFrame from a file and clean it in one pass: invalid geometries are
+    repaired, then null, empty and still-invalid ones are dropped (see clean_gdf).
+    OGR formats are read through pyogrio's Arrow path.
+    GeoParquet files (.parquet) are read directly; written with a covering bbox,
+    a bbox read only decodes the row groups that can intersect it.
     
     Args:
-        gdf_path: Path to the GeoDataFrame file (e.g., shapefile, GeoJSON)
+        gdf_path: Path to the GeoDataFrame file (e.g., shapefile, GeoJSON, GeoParquet)
+        bbox: Optional (minx, miny, maxx, maxy) in the file's CRS to restrict the read to
     """
-    gdf = gpd.read_file(gdf_path)
-    gdf = drop_null_empty_invalid(gdf)
-    gdf = clean_gdf(gdf)
-    return gdf
+    if str(gdf_path).endswith(".parquet"):
+        gdf = gpd.read_parquet(gdf_path, bbox=bbox)
+    else:
+        gdf = gpd.read_file(gdf_path, engine="pyogrio", use_arrow=True, bbox=bbox)
+    return clean_gdf(gdf)
+
+def select_tile_candidates(gdf: gpd.GeoDataFrame, sat_tile) -> gpd.GeoDataFrame:
+    """
+    Rows of gdf that intersect the satellite tile's bounds, found through the spatial
+    index in gdf's own CRS (no reprojection of gdf). gdf.sindex is built on first use
+    and cached on the frame, so a global polygon set is indexed once for all tiles.
+    The exact intersects test runs here too, so polygons whose bounding box merely
+    overlaps the tile (e.g. large coastline multipolygons) are not reprojected later.
+    """
+    b = sat_tile.bounds
+    if gdf.crs is not None and gdf.crs != sat_tile.crs:
+        b = transform_bounds(sat_tile.crs, gdf.crs, b.left, b.bottom, b.right, b.top)
+    return gdf.iloc[np.sort(gdf.sindex.query(box(*b), predicate="intersects"))]
 
-def rasterize_gdf_to_mask(gdf, sat_tile):
+def rasterize_gdf_to_mask(gdf, sat_tile, prefiltered: bool = False):
     """
     Rasterize binary polygon gdf for specific satellite image tile
 
     Args:
       gdf: GeoDataFrame of land polygons
       sat_tile: rasterio dataset of satellite tile
+      prefiltered: gdf already holds only select_tile_candidates(..., sat_tile) rows,
+        so the bounding-box query (and a spatial index over the subset) is skipped
     Returns:
       mask: 2D numpy uint8 array mask where land = 1, water = 0
     """
 
+    b = sat_tile.bounds
+    empty_mask = lambda: np.zeros((sat_tile.height, sat_tile.width), dtype=np.uint8)
+
+    # Pre-filter in the polygons' own CRS so only polygons near the tile are reprojected.
+    # gdf.sindex is built once per GeoDataFrame and reused for every tile queried
+    # against the same (e.g. global land polygon) frame.
+    if not prefiltered:
+        gdf = select_tile_candidates(gdf, sat_tile)
+    if gdf.empty:
+        return empty_mask()
+
     # Reproject land polygons to satellite CRS
-    gdf_in_sat_crs = gdf.to_crs(sat_tile.crs)
+    if gdf.crs is not None and gdf.crs != sat_tile.crs:
+        gdf = gdf.to_crs(sat_tile.crs)
 
     # Drop null/empty/invalid after reprojection
-    gdf_in_sat_crs = drop_null_empty_invalid(gdf_in_sat_crs)
+    gdf = drop_null_empty_invalid(gdf)
 
-    # Clip to satellite image tile bounds (in satellite image CRS)
-    b = sat_tile.bounds
-    tile_geom = box(b.left, b.bottom, b.right, b.top)
+    # Candidates were selected by bounding box in their own CRS; after reprojection
+    # they can all fall outside the tile, which one total_bounds check catches
+    if gdf.empty:
+        return empty_mask()
+    min_x, min_y, max_x, max_y = gdf.total_bounds
+    if max_x < b.left or min_x > b.right or max_y < b.bottom or min_y > b.top:
+        return empty_mask()
 
-    # Keep this conservative: we only use sindex to get candidate rows by bbox,
-    # then still run your exact intersects() filter afterward.
-    gdf_prefilter = gdf_in_sat_crs
-    try:
-        sidx = gdf_in_sat_crs.sindex  # may build lazily
-        cand_idx = list(sidx.intersection(tile_geom.bounds))
-        if len(cand_idx) == 0:
-            # No candidates intersect bounding boxes => definitely no geometry intersects tile
-            return np.zeros((sat_tile.height, sat_tile.width), dtype=np.uint8)
-        gdf_prefilter = gdf_in_sat_crs.iloc[cand_idx]
-    except Exception:
-        # If spatial index is unavailable for any reason, fall back to original behavior.
-        gdf_prefilter = gdf_in_sat_crs
-
-    gdf_clip = gdf_prefilter[gdf_prefilter.intersects(tile_geom)]
+    # The candidates are already bounding-box hits, so the exact test is one vectorized
+    # intersects against the prepared tile box (no per-tile R-tree over the candidates)
+    tile_geom = box(b.left, b.bottom, b.right, b.top)
+    shapely.prepare(tile_geom)
+    geoms = np.asarray(gdf.geometry.values)
+    clipped = geoms[shapely.intersects(tile_geom, geoms)]
 
     # No land intersecting tile
-    if gdf_clip.empty:
-        return np.zeros((sat_tile.height, sat_tile.width), dtype=np.uint8)
+    if clipped.size == 0:
+        return empty_mask()
 
-    gdf_clip = gdf_clip.intersection(tile_geom)
+    # Polygons entirely inside the tile are rasterized as-is. Only the ones crossing
+    # the tile edge get a rectangle clip (much cheaper than a general intersection),
+    # which keeps huge coastline polygons from being rasterized far outside the tile.
+    crossing = ~shapely.contains_properly(tile_geom, clipped)
+    if crossing.any():
+        clipped[crossing] = shapely.clip_by_rect(clipped[crossing], b.left, b.bottom, b.right, b.top)
 
-    gdf_clip = drop_null_empty_invalid(gdf_clip)
+    # Inputs were validated above; only drop what the clip emptied. No second
+    # is_valid pass: clip_by_rect output can be technically invalid but still
+    # rasterizes correctly, and dropping it would lose land.
+    clipped = clipped[~(shapely.is_empty(clipped) | shapely.is_missing(clipped))]
 
     land_mask = rasterize(
-        ((geom, 1) for geom in gdf_clip.geometry),
+        ((geom, 1) for geom in clipped),
         out_shape=(sat_tile.height, sat_tile.width),
         transform=sat_tile.transform,
         fill=0,
@@ -276,8 +508,15 @@ def get_aoi_from_bboxes(
     """
     Given a list of bounding boxes (shapely geometries in reproj_crs),
     return a unified AOI GeoSeries, buffered in meters safely.
+
+    AOIs spanning at most constants.AOI_LOCAL_BUFFER_MAX_SPAN_DEG are buffered in an
+    azimuthal equidistant projection centered on the AOI, where meters are true meters
+    at any latitude. Wider (e.g. global) AOIs fall back to EPSG:3857, since distances
+    in a single AEQD degrade far from its center.
     """
-    aoi_geom = unary_union(bboxes)
+    # unions each group of mutually intersecting boxes on its own and combines the
+    # (disjoint) results, rather than one cascaded union over every tile
+    aoi_geom = shapely.disjoint_subset_union_all(np.asarray(bboxes, dtype=object))
     if hasattr(aoi_geom, "buffer"):
         aoi_geom = aoi_geom.buffer(0)
 
@@ -287,12 +526,19 @@ def get_aoi_from_bboxes(
     aoi = gpd.GeoSeries([aoi_geom], crs=reproj_crs)
 
     if buffer_m > 0:
-        meter_crs = "EPSG:3857"
+        aoi_ll = aoi if aoi.crs.is_geographic else aoi.to_crs(4326)
+        min_lon, min_lat, max_lon, max_lat = aoi_ll.total_bounds
+        span = max(max_lon - min_lon, max_lat - min_lat)
+        if span <= constants.AOI_LOCAL_BUFFER_MAX_SPAN_DEG:
+            lon, lat = aoi_ll.iloc[0].centroid.coords[0]
+            meter_crs = f"+proj=aeqd +lat_0={lat:.6f} +lon_0={lon:.6f} +datum=WGS84 +units=m +no_defs"
+        else:
+            meter_crs = "EPSG:3857"
         aoi_meter = aoi.to_crs(meter_crs)
+        # buffer() of a valid polygon is already valid: no buffer(0) pass needed
         aoi_meter = aoi_meter.buffer(buffer_m)
-        aoi_meter = aoi_meter.buffer(0)
         if aoi_meter.is_empty.any():
-            raise ValueError("AOI geometry became empty after buffering in EPSG:3857.")
+            raise ValueError(f"AOI geometry became empty after buffering in {meter_crs}.")
         aoi = aoi_meter.to_crs(reproj_crs)
 
     return aoi
@@ -308,5 +554,22 @@ def convert_bbox_crs(bbox: box, src_crs: int, dst_crs: int):
     Returns:
       converted_bbox: shapely box geometry in destination CRS
     """
-    bbox_wgs84 = gpd.GeoSeries([bbox], crs=src_crs).to_crs(dst_crs).iloc[0]
-    return bbox_wgs84
+    return convert_bboxes_crs([bbox], src_crs, dst_crs)[0]
+
+def convert_bboxes_crs(bboxes: Sequence[box], src_crs: int, dst_crs: int) -> list:
+    """
+    Convert many bounding boxes sharing one source CRS in a single transform call.
+
+    Args:
+      bboxes: shapely box geometries in source CRS
+      src_crs: EPSG code of source CRS
+      dst_crs: EPSG code of destination CRS
+    Returns:
+      list of shapely geometries in destination CRS, in input order
+    """
+    transformer = _get_epsg_transformer(src_crs, dst_crs)
+    # reprojects the boxes' vertices, as GeoSeries.to_crs would
+    return list(shapely.transform(
+        np.asarray(bboxes, dtype=object),
+        lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])),
+    ))
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass, field, asdict, is_dataclass
+from dataclasses import dataclass, field, fields, asdict, is_dataclass
 from collections.abc import Mapping, Iterator
 from typing import Any
 
@@ -7,19 +7,23 @@ from sat_img_utils.pipelines.config import RESERVED
 
 class NS:
     """
-    Namespace wrapper around dict for attribute-style access.
+    Read-only namespace wrapper around dict for attribute-style access.
+    The dict is wrapped without copying it, so attribute writes are refused rather
+    than leaking into the caller's (possibly module-level) params dict.
     """
+    __slots__ = ("_d",)
+
     def __init__(self, d):
-        object.__setattr__(self, "_d", dict(d))
+        object.__setattr__(self, "_d", d)
 
     def __getattr__(self, k):
         v = self._d[k]
         return NS(v) if isinstance(v, dict) else v
     
     def __setattr__(self, k, v):
-        self._d[k] = v
+        raise AttributeError(f"NS is read-only; cannot set {k!r}")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Context(Mapping[str, Any]):
     """
     General context object for pipelines. 
@@ -28,34 +32,35 @@ class Context(Mapping[str, Any]):
     Each key in extra corresponds to a pipeline component (ie a single filter or transform) 
     that may contain its own parameters.
     Extras override cfg on name collisions.
+    Component namespaces are wrapped once per context and reused on later accesses.
     """
     cfg: Any
     extra: Mapping[str, Any] = field(default_factory=dict)
+    _cfg_keys: frozenset = field(init=False, repr=False, compare=False)
+    _ns: dict = field(init=False, repr=False, compare=False)
+
+    def _wrap(self, name: str) -> Any:
+        ns = self._ns.get(name)
+        if ns is None:
+            v = self.extra[name]
+            if not isinstance(v, dict):
+                return v
+            ns = self._ns[name] = NS(v)
+        return ns
 
     def __getattr__(self, name: str) -> Any:
         if name in self.extra:
-            v = self.extra[name]
-            return NS(v) if isinstance(v, dict) else v
+            return self._wrap(name)
         return getattr(self.cfg, name)  # raises AttributeError if missing
 
     def __getitem__(self, key: str) -> Any:
         if key in self.extra:
-            v = self.extra[key]
-            return NS(v) if isinstance(v, dict) else v
-        if is_dataclass(self.cfg):
-            d = asdict(self.cfg)
-            if key in d:
-                return d[key]
-        return getattr(self.cfg, key)  #
+            return self._wrap(key)
+        return getattr(self.cfg, key)
 
     def __iter__(self) -> Iterator[str]:
-        keys = set(self.extra.keys())
-        if is_dataclass(self.cfg):
-            keys |= set(asdict(self.cfg).keys())
-        else:
-            #cfg attributes aren't enumerable; only extras enumerable
-            pass
-        return iter(keys)
+        # cfg attributes are only enumerable for dataclass configs
+        return iter(set(self.extra.keys()) | self._cfg_keys)
 
     def __len__(self) -> int:
         return sum(1 for _ in self.__iter__())
@@ -79,4 +84,7 @@ class Context(Mapping[str, Any]):
     
     def __post_init__(self) -> None:
         self._validate_extra(self.extra)
+        cfg_keys = frozenset(f.name for f in fields(self.cfg)) if is_dataclass(self.cfg) else frozenset()
+        object.__setattr__(self, "_cfg_keys", cfg_keys)
+        object.__setattr__(self, "_ns", {})
 
@@ -2,17 +2,27 @@ from __future__ import annotations
 import gc
 import math
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple, Union
 
 import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 import rasterio
+from affine import Affine
 from rasterio.windows import Window
 
+from sat_img_utils.configs import constants
 from sat_img_utils.pipelines.config import PatchIterPipelineConfig
 from sat_img_utils.pipelines.context import Context
 from sat_img_utils.core.transforms import pad_to_square
-from sat_img_utils.geo.raster import window_center_longlat   
+from sat_img_utils.geo.raster import reopen_dataset_reader, window_centers_longlat
+
+# Patches handed to the callbacks by cut_patches are read-only: interior patches are
+# views into the shared strip buffer (overlapping when step < patch_size). Filters
+# must not modify them, and a transform must return a new array rather than work in
+# place (np.array(patch) first if it needs a writable copy).
 
 # return true to keep patch, false to skip it
 PatchFilter = Callable[[np.ndarray, Context], bool]
@@ -24,6 +34,85 @@ PatchMetadata = Callable[[Context], Dict[str, Any]]
 
 WriterFn = Callable[[np.ndarray, Context], None]
 
+def _iter_patch_row_strips(
+    ds: rasterio.io.DatasetReader,
+    step: int,
+    patch_size: int,
+    band_count: int,
+    max_size_gb: float = constants.PATCH_STRIP_MAX_GB,
+):
+    """
+    Group the patch row offsets (0, step, 2*step, ...) into full-width strips that fit
+    in max_size_gb, and yield (row offsets, strip window) for each group. The strip
+    covers every row the group's patches touch, so each patch is a slice of it.
+    When the step and the raster's block height divide evenly, the number of patch
+    rows per strip is rounded so strips start on block boundaries.
+    """
+    H, W = ds.height, ds.width
+    bytes_per_row = W * np.dtype(ds.dtypes[0]).itemsize * band_count
+    budget_rows = int(max_size_gb * 1024 ** 3 // max(bytes_per_row, 1))
+    n = max(1, (budget_rows - max(patch_size - step, 0)) // step)
+    block_h = ds.block_shapes[0][0]
+    if step < block_h and block_h % step == 0 and n >= block_h // step:
+        n -= n % (block_h // step)
+
+    row_offsets = list(range(0, H, step))
+    for k in range(0, len(row_offsets), n):
+        rows = row_offsets[k:k + n]
+        top, bottom = rows[0], min(H, rows[-1] + patch_size)
+        yield rows, Window(0, top, W, bottom - top)
+
+def _iter_strip_reads(
+    ds: rasterio.io.DatasetReader,
+    strips: List[Tuple[List[int], Window]],
+    bands: Optional[Union[Sequence[int], int]],
+    prefetch: bool,
+):
+    """
+    Yield (row offsets, strip window, strip array) for every strip. With prefetch, the
+    next strip is read on a background thread while the caller works on the current
+    one. That thread reads through its own handle on the same file, since a GDAL
+    dataset must not be used from two threads at once; if ds can't be reopened that
+    way (see reopen_dataset_reader), strips are read sequentially from ds.
+    """
+    def read(reader, strip):
+        return reader.read(window=strip) if bands is None else reader.read(bands, window=strip)
+
+    reader = reopen_dataset_reader(ds) if prefetch and len(strips) >= 2 else None
+    if reader is None:
+        for rows, strip in strips:
+            yield rows, strip, read(ds, strip)
+        return
+
+    with reader, ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(read, reader, strips[0][1])
+        for k, (rows, strip) in enumerate(strips):
+            buf = pending.result()
+            if k + 1 < len(strips):
+                pending = pool.submit(read, reader, strips[k + 1][1])
+            yield rows, strip, buf
+
+def _append_metadata_row(columns: Dict[str, List[Any]], n_rows: int, row: Dict[str, Any]) -> None:
+    """
+    Append one metadata dict to column lists holding n_rows rows so far. Keys missing
+    from the row (or first seen in it) are filled with None, so columns stay aligned.
+    """
+    for k, v in row.items():
+        col = columns.get(k)
+        if col is None:
+            col = columns[k] = [None] * n_rows
+        col.append(v)
+    if len(row) != len(columns):
+        for col in columns.values():
+            if len(col) == n_rows:
+                col.append(None)
+
+def _passes(filters: Sequence[PatchFilter], patch: np.ndarray, context: Context) -> bool:
+    for f in filters:
+        if not f(patch, context):
+            return False
+    return True
+
 def cut_patches(
     ds: rasterio.io.DatasetReader,
     *,
@@ -36,94 +125,123 @@ def cut_patches(
     metadata_fn: Optional[PatchMetadata] = None,
     writer_fn: Optional[WriterFn] = None,
     extra_ctx: Optional[Dict[str, Dict[str, Any]]] = None,
-    ):
+    prefetch: bool = False,
+    strip_max_gb: float = constants.PATCH_STRIP_MAX_GB,
+    ) -> pd.DataFrame:
     """
     General pattern: 
     patch through the image
     pad patch as necessary
     apply patch-level filters to decide whether to keep patch
     log any metadata about the patch with whatever custom function (default is just save patch name and longitude/latitude center)
-    return the patch metadata as a list of dicts
+    return the patch metadata as a DataFrame with one row per kept patch (metadata_fn's
+    dict as columns; no columns without a metadata_fn, so len() is still the kept count)
 
+    The image is read in full-width strips of at most strip_max_gb (a budget covering
+    the whole tile reads it in one call); with prefetch, the next strip is read
+    in the background (through a second handle reopened from ds.name, so only for
+    plain file-backed datasets; others fall back to sequential reads) while patches
+    of the current one are processed.
     """
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
     step = cfg.step if cfg.step is not None else cfg.patch_size
     H, W = ds.height, ds.width
     kept = 0
-    metadata: List[Dict[str, Any]] = []
+    # metadata is accumulated column-wise rather than as one retained dict per patch
+    metadata_columns: Dict[str, List[Any]] = {}
     filters_before_transform = list(filters_before_transform or [])
     filters_after_transform = list(filters_after_transform or [])
+    # hoisted out of the per-patch loop
+    ps, pad_value, src_crs = cfg.patch_size, cfg.pad_value, ds.crs
+    # patch (i, j) transform is the source transform shifted to pixel (j, i)
+    sa, sb, sc, sd, se, sf = ds.transform[:6]
+    extra = dict(extra_ctx or {})
     
     logging.info(f"Starting patches for {img_name}")
 
-    for i in range(0, H, step):
-        for j in range(0, W, step):
-            window_h, window_w = min(cfg.patch_size, H - i), min(cfg.patch_size, W - j)
-            window = Window(j, i, window_w, window_h)
-
-            patch_name = f"{img_name}_patch_{i}_{j}.npy"
-            out_path = out_dir / patch_name
-
-            if cfg.bands is None:
-                patch = ds.read(window=window)
-            else:
-                patch = ds.read(cfg.bands, window=window)
-            patch = pad_to_square(
-                patch,
-                patch_size=cfg.patch_size,
-                pad_value=cfg.pad_value,
-            ) 
-            long_center, lat_center = window_center_longlat(ds, window)
-            patch_extra_ctx = dict(extra_ctx or {})
-            # General per-patch context
-            patch_extra_ctx["patch"] = {
-                "patch_name": patch_name,
-                "i": i,
-                "j": j,
-                "height": cfg.patch_size,
-                "width": cfg.patch_size,
-                "window": window,
-                "transform": ds.window_transform(window),
-                "src_crs": ds.crs,
-                "long_center": long_center,
-                "lat_center": lat_center,
-            }
-
-            context = Context(cfg=cfg, extra=patch_extra_ctx)
-
-            # Filters before transform
-            skip = False
-            for f in filters_before_transform:
-                if not f(patch, context):
-                    skip = True
-                    break
-            if skip:
-                continue
-
-            # Transform
-            if transform is not None:
-                patch = transform(patch, context)
-                if patch is None:
+    if cfg.bands is None:
+        band_count = ds.count
+    elif isinstance(cfg.bands, int):
+        band_count = 1
+    else:
+        band_count = len(cfg.bands)
+
+    # Read one full-width strip per group of patch rows and slice the patches out of
+    # it, instead of issuing a small read (and re-decoding shared blocks) per patch.
+    strips = list(_iter_patch_row_strips(ds, step, cfg.patch_size, band_count, strip_max_gb))
+    for rows, strip, buf in _iter_strip_reads(ds, strips, cfg.bands, prefetch):
+        for i in rows:
+            r = i - strip.row_off
+            window_h = min(ps, H - i)
+            row_band = buf[..., r:r + window_h, :]
+            # zero-copy (N, [C,] h, patch_size) view of the patches that fit inside the
+            # tile width; only the patches at the right edge are sliced (and padded) one by one
+            full_patches, n_full = None, 0
+            if W >= ps:
+                full_patches = np.moveaxis(
+                    sliding_window_view(row_band, ps, axis=-1)[..., ::step, :], -2, 0
+                )
+                n_full = full_patches.shape[0]
+            row_windows = [Window(j, i, min(ps, W - j), window_h) for j in range(0, W, step)]
+            # one batched CRS conversion for the whole patch row
+            long_centers, lat_centers = window_centers_longlat(ds, row_windows)
+            for k, (window, long_center, lat_center) in enumerate(
+                zip(row_windows, long_centers.tolist(), lat_centers.tolist())
+            ):
+                j, window_w = window.col_off, window.width
+                patch_name = f"{img_name}_patch_{i}_{j}.npy"
+
+                patch = pad_to_square(
+                    full_patches[k] if k < n_full else row_band[..., j:j + window_w],
+                    patch_size=ps,
+                    pad_value=pad_value,
+                ) 
+                # padded edge patches are fresh arrays; make them read-only like the
+                # interior views so in-place writes fail the same way for every patch
+                patch.flags.writeable = False
+                # General per-patch context. Only the "patch" entry changes between
+                # patches; the component params are shared by a shallow copy, so a
+                # callback that keeps its context still sees its own patch.
+                patch_extra = {**extra, "patch": {
+                    "patch_name": patch_name,
+                    "i": i,
+                    "j": j,
+                    "height": ps,
+                    "width": ps,
+                    "window": window,
+                    "transform": Affine(sa, sb, sa * j + sb * i + sc, sd, se, sd * j + se * i + sf),
+                    "src_crs": src_crs,
+                    "long_center": long_center,
+                    "lat_center": lat_center,
+                }}
+
+                context = Context(cfg=cfg, extra=patch_extra)
+
+                # Filters before transform
+                if filters_before_transform and not _passes(filters_before_transform, patch, context):
                     continue
 
-            # Filters after transform
-            skip = False
-            for f in filters_after_transform:
-                if not f(patch, context):
-                    skip = True
-                    break
-            if skip:
-                continue
+                # Transform
+                if transform is not None:
+                    patch = transform(patch, context)
+                    if patch is None:
+                        continue
+
+                # Filters after transform
+                if filters_after_transform and not _passes(filters_after_transform, patch, context):
+                    continue
             
-            writer_fn(patch, context)
-            metadata.append(metadata_fn(context))
+                if writer_fn is not None:
+                    writer_fn(patch, context)
+                if metadata_fn is not None:
+                    _append_metadata_row(metadata_columns, kept, metadata_fn(context))
 
-            kept += 1
-            if cfg.gc_every and kept % cfg.gc_every == 0:
-                gc.collect()
+                kept += 1
+                if cfg.gc_every and kept % cfg.gc_every == 0:
+                    gc.collect()
     logging.info(f"Finished {img_name}: kept {kept} out of {math.ceil(H / step) * math.ceil(W / step)} patches")
-    return metadata
+    return pd.DataFrame(metadata_columns, index=pd.RangeIndex(kept))
 
 def init_patch_config(
     patch_size: int,
@@ -4,31 +4,53 @@ import logging
 import numpy as np
 import rasterio
 import geopandas as gpd
-import pandas as pd
 
 from sat_img_utils.core.utils import(
     get_memory_mb,
     get_sat_tile_memory, 
     make_dirs_if_not_exists
 )
-from sat_img_utils.geo.metadata import list_dict_to_parquet
+from sat_img_utils.geo.metadata import list_dict_to_parquet, merge_parquet_files
 from sat_img_utils.datasets.ghsl import detect_buildings, detect_buildings_chunked
 from sat_img_utils.datasets.osm_land_poly import LandMaskVRT, osm_rasterize_sat_land_mask
 from sat_img_utils.datasets.capella import gen_capella_tile_patches, iter_capella_sar_paths
-from sat_img_utils.geo.raster import convert_bbox_crs, get_aoi_from_bboxes, get_gdf
+from sat_img_utils.geo.raster import convert_bboxes_crs, get_aoi_from_bboxes, get_gdf
 from sat_img_utils.configs import ds_constants
 from shapely.geometry import box
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 import glob
 import gc
 import logging
 import time
 
+# Per-process GHSL and land mask handles for the worker pool (see _init_sar_worker)
+_WORKER_STATE = {}
+
+# Process memory (MB) above which the next finished tile triggers a full gc pass
+_GC_TRIGGER_MB = 0.0
+
+def _maybe_collect():
+    """
+    Run a full gc pass only after memory grew by SAR_GC_GROWTH_FACTOR since the last one.
+    Tile arrays are freed by refcounting as soon as a tile finishes; a full collection
+    after every tile mostly re-scans a heap with nothing cyclic left to free.
+    """
+    global _GC_TRIGGER_MB
+    if get_memory_mb() > _GC_TRIGGER_MB:
+        gc.collect()
+        _GC_TRIGGER_MB = get_memory_mb() * ds_constants.SAR_GC_GROWTH_FACTOR
+
 def process_sar_single_image(sar_path, ghsl, all_landmask, out_dir,
                              patch_size, metadata_out_dir, crs, extended_metadata_path):
+    img_name = Path(sar_path).stem
+    # memory lookups are only worth the psutil call when they are logged
+    log_info = logging.getLogger().isEnabledFor(logging.INFO)
     logging.info(f"\nProcessing {sar_path}")
-    logging.info(f"Initial memory: {get_memory_mb():.0f}MB")
+    if log_info:
+        logging.info(f"Initial memory: {get_memory_mb():.0f}MB")
     start_img = time.time()
     num_patches = 0
     with rasterio.open(sar_path) as sar:
@@ -41,13 +63,13 @@ def process_sar_single_image(sar_path, ghsl, all_landmask, out_dir,
                 building_ratio = detect_buildings(ghsl, sar, filter_value = ds_constants.GHSL_BUILDINGS_THRESHOLD)
             else:
                 building_ratio = detect_buildings_chunked(ghsl, sar, filter_value = ds_constants.GHSL_BUILDINGS_THRESHOLD)
-            logging.info(f"Total building coverage for {Path(sar_path).stem}: {building_ratio}")
+            logging.info(f"Total building coverage for {img_name}: {building_ratio}")
             
             if building_ratio >= ds_constants.GHSL_MIN_BUILDING_COVG:
                 start = time.time()
                 land_mask = all_landmask.get_mask_for_tile(sar)
                 end = time.time()
-                logging.info(f"OSM land rasterization time for {Path(sar_path).stem}: {end - start:.2f} seconds")
+                logging.info(f"OSM land rasterization time for {img_name}: {end - start:.2f} seconds")
                 metadata = gen_capella_tile_patches(
                     ds=sar,
                     out_dir=out_dir,
@@ -56,35 +78,64 @@ def process_sar_single_image(sar_path, ghsl, all_landmask, out_dir,
                     patch_size=patch_size,
                     nodata=0,
                 )
-                metadata_path = f"{metadata_out_dir}/patch_metadata_{Path(sar_path).stem}.parquet"
-                list_dict_to_parquet(
-                    metadata_list=metadata,
-                    out_path=metadata_path,
-                    crs=crs
-                )
+                metadata_path = f"{metadata_out_dir}/patch_metadata_{img_name}.parquet"
+                # metadata is cut_patches' DataFrame, one row per kept patch
+                list_dict_to_parquet(metadata, out_path=metadata_path, crs=crs)
 
-                num_patches += len(metadata) if metadata is not None else 0
+                num_patches += len(metadata)
             
-    sar.close()
-    gc.collect()
-    logging.info(f"Final memory: {get_memory_mb():.0f}MB")
+    _maybe_collect()
+    if log_info:
+        logging.info(f"Final memory: {get_memory_mb():.0f}MB")
     end_img = time.time()
-    logging.info(f"Processing time for {Path(sar_path).stem}: {end_img - start_img:.2f} seconds")
+    logging.info(f"Processing time for {img_name}: {end_img - start_img:.2f} seconds")
     return num_patches
 
 
+def _gdal_env(num_workers=1):
+    """
+    GDAL settings for tile processing: decode compressed GHSL/SAR blocks on several
+    threads, splitting the CPUs between worker processes.
+    """
+    return rasterio.Env(GDAL_NUM_THREADS=str(max(1, (os.cpu_count() or 1) // max(1, num_workers))))
+
+def _init_sar_worker(ghsl_path, osm_land_vrt_path):
+    """
+    Open the GHSL raster and the land mask VRT once per worker process.
+    Open datasets can't be pickled, so workers get paths and keep their own handles.
+    """
+    _WORKER_STATE["ghsl"] = rasterio.open(ghsl_path)
+    _WORKER_STATE["all_landmask"] = LandMaskVRT(osm_land_vrt_path)
+    # forked workers inherit the parent's global RNG state; the random land filter
+    # would otherwise draw the same sequence in every worker
+    np.random.seed()
+
+def _process_sar_in_worker(sar_path, extended_metadata_path, num_workers=1, **kwargs):
+    with _gdal_env(num_workers):
+        return process_sar_single_image(
+            sar_path,
+            _WORKER_STATE["ghsl"],
+            _WORKER_STATE["all_landmask"],
+            extended_metadata_path=extended_metadata_path,
+            **kwargs,
+        )
+
 def process_sar(capella_dir, 
                 target_dir, 
                 ghsl_path, 
                 osm_land_vrt_path, 
                 patch_size, 
                 crs=4326, 
-                flat=False):
+                flat=False,
+                num_workers=1):
     """
     Process SAR images, supporting two directory structures:
     1. Year-based: capella_dir/YEAR/DIR_NAME/DIR_NAME.tif
     2. Flat: capella_dir/DIR_NAME/DIR_NAME.tif
     Set flat=True for the second structure.
+    Tiles are independent; with num_workers > 1 they are processed in a pool of
+    worker processes, each holding its own GHSL and land mask handles. Every worker
+    can hold a full SAR tile in memory, so size the pool to the available memory.
     """
 
     make_dirs_if_not_exists(target_dir)
@@ -93,51 +144,87 @@ def process_sar(capella_dir,
     patch_metadata_out_dir = f'{target_dir}/patch_metadata'
     make_dirs_if_not_exists(patch_metadata_out_dir)
 
-    all_landmask = LandMaskVRT(osm_land_vrt_path)
-
     total_num_patches = 0
     logging.info(f'Processing SAR images in {capella_dir}')
-    with rasterio.open(ghsl_path) as ghsl:
-        for sar_path, extended_metadata_path in iter_capella_sar_paths(capella_dir, flat=flat):
-            total_num_patches += process_sar_single_image(
-                sar_path,
-                ghsl,
-                all_landmask,
-                new_target_dir,
-                patch_size,
-                patch_metadata_out_dir,
-                crs,
-                extended_metadata_path,
-            )
+    sar_paths = list(iter_capella_sar_paths(capella_dir, flat=flat))
+    tile_kwargs = dict(
+        out_dir=new_target_dir,
+        patch_size=patch_size,
+        metadata_out_dir=patch_metadata_out_dir,
+        crs=crs,
+    )
+    if num_workers > 1 and len(sar_paths) > 1:
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_sar_worker,
+            initargs=(ghsl_path, osm_land_vrt_path),
+        ) as pool:
+            total_num_patches = sum(pool.map(
+                partial(_process_sar_in_worker, num_workers=num_workers, **tile_kwargs),
+                [sar_path for sar_path, _ in sar_paths],
+                [extended_metadata_path for _, extended_metadata_path in sar_paths],
+                chunksize=1,
+            ))
+    else:
+        all_landmask = LandMaskVRT(osm_land_vrt_path)
+        try:
+            with _gdal_env(), rasterio.open(ghsl_path) as ghsl:
+                for sar_path, extended_metadata_path in sar_paths:
+                    total_num_patches += process_sar_single_image(
+                        sar_path,
+                        ghsl,
+                        all_landmask,
+                        extended_metadata_path=extended_metadata_path,
+                        **tile_kwargs,
+                    )
+        finally:
+            all_landmask.close()
 
     logging.info(f'Total patches saved: {total_num_patches}')
 
-    files = glob.glob(f"{patch_metadata_out_dir}/patch_metadata_*.parquet")
-    dfs = [gpd.read_parquet(f) for f in files]
-    if len(dfs) == 0:
+    merged_path = f"{patch_metadata_out_dir}/patch_metadata_all.parquet"
+    files = sorted(
+        f for f in glob.glob(f"{patch_metadata_out_dir}/patch_metadata_*.parquet")
+        if os.path.abspath(f) != os.path.abspath(merged_path)
+    )
+    if len(files) == 0:
         logging.info("No patch metadata files found to merge.")
     else:
-        merged = gpd.GeoDataFrame(pd.concat(dfs, ignore_index=True), crs=f"EPSG:{crs}")
-        merged.to_parquet(f"{patch_metadata_out_dir}/patch_metadata_all.parquet", index=False)
-        logging.info(f'Merged metadata saved to {patch_metadata_out_dir}/patch_metadata_all.parquet')
+        merge_parquet_files(files, merged_path)
+        logging.info(f'Merged metadata saved to {merged_path}')
 
 
+def _read_tile_bounds(sar_path):
+    """
+    Header-only read of a SAR tile: (bounds box, EPSG code)
+    """
+    logging.info(f'Processing SAR image: {sar_path}')
+    with rasterio.open(sar_path) as sar:
+        return box(*sar.bounds), sar.crs.to_epsg()
+
 def get_capella_aoi(capella_dir, out_aoi_path,
                     flat=False) -> gpd.GeoSeries:
     """
     Get the AOI for Capella SAR dataset based on bounding boxes
     """
-    make_dirs_if_not_exists(os.path.dirname(out_aoi_path))
+    sar_paths = [sar_path for sar_path, _ in iter_capella_sar_paths(capella_dir, flat=flat)]
+    # opening a tile only parses its header, so the opens are IO bound and overlap well in threads
+    with ThreadPoolExecutor(max_workers=ds_constants.CAPELLA_HEADER_READ_WORKERS) as pool:
+        tile_bounds = list(pool.map(_read_tile_bounds, sar_paths))
+
+    # one reprojection per source CRS instead of one per tile
+    bboxes_by_crs = {}
+    for bbox, epsg in tile_bounds:
+        bboxes_by_crs.setdefault(epsg, []).append(bbox)
     bboxes = []
-    for sar_path, _ in iter_capella_sar_paths(capella_dir, flat=flat):
-        logging.info(f'Processing SAR image: {sar_path}')
-        with rasterio.open(sar_path) as sar:
-            bboxes.append(convert_bbox_crs(box(*sar.bounds), sar.crs.to_epsg(), ds_constants.CAPELLA_DEFAULT_OUT_CRS))
+    for epsg, crs_bboxes in bboxes_by_crs.items():
+        bboxes.extend(convert_bboxes_crs(crs_bboxes, epsg, ds_constants.CAPELLA_DEFAULT_OUT_CRS))
     
     aoi = get_aoi_from_bboxes(bboxes, reproj_crs=ds_constants.CAPELLA_DEFAULT_OUT_CRS)
     logging.info(f"AOI CRS: {aoi.crs}")
     logging.info(f"AOI bounds: {aoi.total_bounds}")
     if out_aoi_path is not None:
+        make_dirs_if_not_exists(os.path.dirname(out_aoi_path) or ".")
         aoi.to_file(out_aoi_path, driver="GeoJSON")
         logging.info(f"AOI saved to {out_aoi_path}")
     return aoi
@@ -170,6 +257,7 @@ if __name__ == "__main__":
     gen_parser.add_argument('--patch_size', type=int, default=512, help='Size of the patches to generate')
     gen_parser.add_argument('--crs', type=int, default=ds_constants.CAPELLA_DEFAULT_OUT_CRS, help='Output CRS EPSG code for metadata')
     gen_parser.add_argument('--flat', action='store_true', help='Set if capella_dir is flat (no year subfolders)')
+    gen_parser.add_argument('--num_workers', type=int, default=1, help='Number of worker processes (tiles processed in parallel)')
     gen_parser.add_argument('--log', action='store_true', help='Enable logging output')
 
     aoi_parser = subparsers.add_parser("get_aoi", help="Get AOI for Capella SAR dataset.")
@@ -191,7 +279,8 @@ if __name__ == "__main__":
             osm_land_vrt_path=args.osm_land_vrt_path,
             patch_size=args.patch_size,
             crs=args.crs,
-            flat=args.flat
+            flat=args.flat,
+            num_workers=args.num_workers,
         )
     elif args.command == "get_aoi":
         aoi = get_capella_aoi(
@@ -25,47 +25,52 @@ from typing import Iterable, Set, Tuple
 from urllib.request import urlopen
 
 
-CAPELLA_NAME_RE = re.compile(r"(CAPELLA_[A-Z0-9_]+)")
+CAPELLA_NAME_RE = re.compile(r"(CAPELLA_[A-Z0-9_]+)", re.ASCII)
+# same pattern for matching tiles.txt as raw bytes
+CAPELLA_NAME_BYTES_RE = re.compile(rb"(CAPELLA_[A-Z0-9_]+)")
 CAPELLA_ITEM_JSON_RE = re.compile(r"(CAPELLA_[^/]+)\.json$")
 
 
-def _read_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="replace")
-
-
 def _load_json_from_path_or_url(stac: str) -> dict:
+    # json.load takes the raw UTF-8 bytes; no separate decoded copy of the document
     if stac.startswith("http://") or stac.startswith("https://"):
         with urlopen(stac) as r:
-            return json.loads(r.read().decode("utf-8"))
+            return json.load(r)
     else:
-        return json.loads(_read_text(Path(stac)))
+        with Path(stac).open("rb") as f:
+            return json.load(f)
 
 
-def _extract_capella_names_from_tiles_txt(lines: Iterable[str]) -> Set[str]:
+def _extract_capella_names_from_tiles_txt(lines: Iterable[bytes]) -> Set[str]:
     """
     tiles.txt can be:
       - plain names (one per line)
       - `ls -l` style lines where the name is last
     We just regex for CAPELLA_* anywhere in the line and take the last match.
+    Lines are raw bytes; names are ASCII, so only the distinct matches get decoded.
     """
-    names: Set[str] = set()
+    names: Set[bytes] = set()
+    findall = CAPELLA_NAME_BYTES_RE.findall
     for line in lines:
-        matches = CAPELLA_NAME_RE.findall(line.strip())
+        matches = findall(line)
         if matches:
             names.add(matches[-1])
-    return names
+    return {n.decode("ascii") for n in names}
 
 
-def _extract_capella_names_from_collection_links(collection: dict) -> Set[str]:
+def _extract_capella_names_from_collection_links(collection: dict) -> Tuple[Set[str], int]:
     """
     Extract CAPELLA_* basenames from collection['links'][*]['href'] when rel == 'item'.
+    Returns (names, number of item links), both gathered in one pass over the links.
     """
     links = collection.get("links", [])
     names: Set[str] = set()
+    item_links = 0
 
     for link in links:
         if link.get("rel") != "item":
             continue
+        item_links += 1
         href = link.get("href", "")
         m = CAPELLA_ITEM_JSON_RE.search(href)
         if m:
@@ -76,7 +81,7 @@ def _extract_capella_names_from_collection_links(collection: dict) -> Set[str]:
             if matches:
                 names.add(matches[-1])
 
-    return names
+    return names, item_links
 
 
 def main() -> int:
@@ -93,15 +98,16 @@ def main() -> int:
 
     collection = _load_json_from_path_or_url(args.stac)
 
-    tile_names = _extract_capella_names_from_tiles_txt(_read_text(tiles_path).splitlines())
-    stac_names = _extract_capella_names_from_collection_links(collection)
+    tile_names = _extract_capella_names_from_tiles_txt(tiles_path.read_bytes().splitlines())
+    stac_names, stac_item_links = _extract_capella_names_from_collection_links(collection)
+    del collection
     overlaps = sorted(tile_names & stac_names)
 
     report = {
         "stac": args.stac,
         "tiles_file": str(tiles_path),
         "tiles_count": len(tile_names),
-        "stac_item_links_count": sum(1 for l in collection.get("links", []) if l.get("rel") == "item"),
+        "stac_item_links_count": stac_item_links,
         "stac_item_names_count": len(stac_names),
         "overlap_count": len(overlaps),
         "overlaps": overlaps,
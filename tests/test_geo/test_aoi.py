@@ -0,0 +1,22 @@
+import geopandas as gpd
+import shapely
+from sat_img_utils.configs.constants import CRS
+from sat_img_utils.geo.aoi import explode_aoi_to_files
+
+def test_explode_aoi_single_file_mixed_polygon_types(tmp_path):
+    """
+    A first batch of plain Polygons followed by a batch that make_valid turns into a
+    MultiPolygon (self-intersecting bowtie) must append to the same FlatGeobuf layer.
+    """
+    bowtie = shapely.Polygon([(0, 0), (10, 10), (10, 0), (0, 10), (0, 0)])
+    geoms = [shapely.box(0, 0, 1, 1), shapely.box(2, 2, 3, 3), bowtie]
+    in_path = tmp_path / "aoi.geojson"
+    gpd.GeoDataFrame({"name": ["a", "b", "c"]}, geometry=geoms, crs=3857).to_file(in_path)
+
+    explode_aoi_to_files(str(in_path), str(tmp_path / "out"), out_crs=CRS.WEB_MERCATOR,
+                         single_file=True, batch_size=2)
+
+    parts = gpd.read_file(tmp_path / "out" / f"aoi_parts_{int(CRS.WEB_MERCATOR)}.fgb")
+    assert len(parts) == 3
+    assert set(parts.geom_type) == {"MultiPolygon"}
+    assert parts.area.sum() == 2 + shapely.make_valid(bowtie).area
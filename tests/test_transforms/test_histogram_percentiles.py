@@ -0,0 +1,28 @@
+import numpy as np
+from sat_img_utils.core.transforms import histogram_percentiles, sar_db_percentiles, sar_log10, sar_valid_mask
+
+def test_histogram_percentiles_within_one_bin():
+    """
+    Histogram percentiles should be within one bin width of np.percentile.
+    """
+    values = np.random.default_rng(0).normal(10.0, 15.0, 200_000).astype(np.float32)
+    bins = 4096
+    bin_width = (values.max() - values.min()) / bins
+    approx = histogram_percentiles(values, (1, 50, 99), bins=bins)
+    exact = np.percentile(values, (1, 50, 99))
+    assert np.all(np.abs(approx - exact) <= bin_width)
+
+def test_histogram_percentiles_constant_input():
+    assert np.array_equal(histogram_percentiles(np.full(10, 3.0), (1, 99)), [3.0, 3.0])
+
+def test_sar_db_percentiles_uint16_exact():
+    """
+    The uint16 path should give the exact lower-rank percentiles of the valid dB values.
+    """
+    img = np.random.default_rng(0).gamma(1.5, 300, (300, 200)).astype(np.uint16)
+    img[:20] = 0
+    scale_factor = 0.01
+    valid = sar_valid_mask(img, nodata=0, scale_factor=scale_factor)
+    expected = np.percentile(sar_log10(img[valid].astype(np.float32), scale_factor), (1, 50, 99.99), method="lower")
+    got = sar_db_percentiles(img, (1, 50, 99.99), scale_factor=scale_factor, nodata=0)
+    assert np.array_equal(got, expected)
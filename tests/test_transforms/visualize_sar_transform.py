@@ -14,21 +14,20 @@ Or pass paths directly:
 
 import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.colors import ListedColormap
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from types import SimpleNamespace
 
 import rasterio
+from affine import Affine
+from rasterio.coords import BoundingBox
+from rasterio.windows import Window, bounds as window_bounds
 
-from sat_img_utils.core.transforms import sar_up_contrast_convert_uint8_pval_ctx, sar_log10
-from sat_img_utils.core.masks import get_valid_mask
-from sat_img_utils.configs.constants import LOG_EPS
+from sat_img_utils.core.transforms import sar_up_contrast_convert_uint8_pval_ctx, sar_db_percentiles
 from sat_img_utils.configs.ds_constants import CAPELLA_BANDS, CAPELLA_OVERVIEW_TARGET_WIDTH
 from sat_img_utils.datasets.capella import get_capella_percentiles, read_scale_factor_from_capella_metadata
 from sat_img_utils.datasets.osm_land_poly import LandMaskVRT
-from sat_img_utils.geo.raster import choose_overview_level, get_overview
+from sat_img_utils.geo.raster import read_overview_for_width
 
 from typing import Optional
 
@@ -36,15 +35,74 @@ _LAND_COLOUR   = np.array([0.20, 0.75, 0.20, 0.35])   # semi-transparent green
 _WATER_COLOUR  = np.array([0.10, 0.45, 0.85, 0.45])   # semi-transparent blue
 _NODATA_COLOUR = np.array([0.80, 0.80, 0.80, 0.25])   # light grey
 
+# uint8 mask value -> RGBA overlay colour (other values stay transparent). Stored
+# as uint8 RGBA, which imshow takes directly: 4 bytes per pixel instead of 16.
+_OVERLAY_LUT = np.zeros((256, 4), dtype=np.uint8)
+_OVERLAY_LUT[0]   = np.round(_WATER_COLOUR * 255)
+_OVERLAY_LUT[1]   = np.round(_LAND_COLOUR * 255)
+_OVERLAY_LUT[255] = np.round(_NODATA_COLOUR * 255)
+
+# uint8 mask value -> opaque RGB for the mask panel. Any value other than
+# water/land gets the nodata colour, as the clipped 3-colour colormap gave it.
+_MASK_RGB_LUT = np.empty((256, 3), dtype=np.uint8)
+_MASK_RGB_LUT[:] = np.round(_NODATA_COLOUR[:3] * 255)
+_MASK_RGB_LUT[0] = np.round(_WATER_COLOUR[:3] * 255)
+_MASK_RGB_LUT[1] = np.round(_LAND_COLOUR[:3] * 255)
+
+# Largest side (pixels) a crop is rendered at; bigger crops are decimated on read.
+# Each panel is only ~600 px wide on screen, so full-resolution arrays for a
+# whole-scene crop would cost hundreds of MB for no visible detail.
+_DISPLAY_MAX_PX = 2048
+
 
 def _make_overlay(land_patch: np.ndarray) -> np.ndarray:
     """Convert a (H,W) land mask (0=water, 1=land, 255=nodata) to an RGBA image."""
-    h, w = land_patch.shape
-    rgba = np.zeros((h, w, 4), dtype=np.float32)
-    rgba[land_patch == 1]   = _LAND_COLOUR
-    rgba[land_patch == 0]   = _WATER_COLOUR
-    rgba[land_patch == 255] = _NODATA_COLOUR
-    return rgba
+    # one gather through the LUT instead of a compare + masked write per class
+    return _OVERLAY_LUT[land_patch]
+
+
+def _decimate(img: np.ndarray, stride: int, mean: bool = False) -> np.ndarray:
+    """
+    Shrink a (H,W) array by an integer stride, trimming to whole blocks so every
+    panel comes out the same shape. mean=True averages each stride x stride block
+    (smoother for speckled SAR); otherwise the top-left pixel is kept (nearest,
+    for class masks).
+    """
+    if stride <= 1:
+        return img
+    h, w = (img.shape[0] // stride) * stride, (img.shape[1] // stride) * stride
+    if not mean:
+        return img[:h:stride, :w:stride]
+    blocks = img[:h, :w].reshape(h // stride, stride, w // stride, stride)
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(img.dtype)
+
+
+def _gray_rgb(img: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+    """(H,W) array -> uint8 (H,W,3), as imshow(cmap="gray", vmin, vmax) would colour it."""
+    if img.dtype == np.uint8 and vmin == 0 and vmax == 255:
+        g = img
+    else:
+        scaled = img.astype(np.float32)
+        scaled -= vmin
+        scaled *= 255 / max(vmax - vmin, np.finfo(np.float32).tiny)
+        g = np.clip(scaled, 0, 255, out=scaled).astype(np.uint8)
+    return np.repeat(g[..., None], 3, axis=2)
+
+
+def _composite_overlay(gray_rgb: np.ndarray, land_patch: np.ndarray) -> np.ndarray:
+    """Alpha-blend the land mask overlay onto a uint8 RGB image (one opaque image to draw)."""
+    overlay = _make_overlay(land_patch)
+    alpha = overlay[..., 3:].astype(np.float32) / 255
+    out = gray_rgb.astype(np.float32)
+    out *= 1 - alpha
+    out += overlay[..., :3] * alpha
+    return out.astype(np.uint8)
+
+
+def _raw_log_rgb(crop_raw: np.ndarray) -> np.ndarray:
+    raw_log = crop_raw.astype(np.float32)
+    np.log1p(raw_log, out=raw_log)  # in place on the cast copy: no second float buffer
+    return _gray_rgb(raw_log, float(raw_log.min()), float(raw_log.max()))
 
 
 def visualize(
@@ -54,6 +112,7 @@ def visualize(
     row: Optional[int] = None,
     col: Optional[int] = None,
     size: Optional[int] = None,
+    verbose: bool = False,
 ) -> None:
     img_stem = Path(path_to_img).stem
     
@@ -65,21 +124,24 @@ def visualize(
         if size is None:
             size = ds.height
 
-        print("Percent of image that is black: ", np.mean(ds.read(1) == 0))
+        if verbose:
+            # full-scene scan, counted block by block so peak memory stays at one block
+            n_black = sum(
+                int(np.count_nonzero(ds.read(1, window=win) == 0)) for _, win in ds.block_windows(1)
+            )
+            print("Percent of image that is black: ", n_black / (ds.height * ds.width))
         nodata = ds.nodata if ds.nodata is not None else 0
-        overview_level = choose_overview_level(ds, CAPELLA_OVERVIEW_TARGET_WIDTH)
-        overview = get_overview(ds, CAPELLA_BANDS, overview_level)
+        overview = read_overview_for_width(ds, CAPELLA_BANDS, CAPELLA_OVERVIEW_TARGET_WIDTH)
 
         scale_factor = read_scale_factor_from_capella_metadata(path_to_metadata)
         low_pct, high_pct = get_capella_percentiles(img_stem)
 
-        valid = (
-            get_valid_mask(overview, nodata=nodata)
-            & (overview > 0)
-            & (overview * scale_factor > LOG_EPS)
+        # histogram-based (O(N), no sort) over ~100k strided overview pixels: plenty
+        # for a display stretch (the patch pipeline uses every pixel)
+        low_val, high_val = sar_db_percentiles(
+            overview, (low_pct, high_pct), scale_factor=scale_factor, nodata=nodata,
+            max_samples=100_000,
         )
-        overview_db = sar_log10(overview[valid], scale_factor)
-        low_val, high_val = np.percentile(overview_db, (low_pct, high_pct))
         print(f"Scale factor : {scale_factor}")
         print(f"Percentiles  : [{low_pct}, {high_pct}]  →  [{low_val:.2f}, {high_val:.2f}] dB")
 
@@ -92,52 +154,81 @@ def visualize(
             ),
         )
 
-        img_raw = ds.read(1)
-        img_u8  = sar_up_contrast_convert_uint8_pval_ctx(img_raw, ctx=ctx)
+        # only the crop is read and transformed (Window clips like the array slice did);
+        # crops larger than _DISPLAY_MAX_PX are decimated by GDAL (nearest) on read
+        win = Window(col, row, size, size).intersection(Window(0, 0, ds.width, ds.height))
+        win_h, win_w = int(win.height), int(win.width)
+        stride = -(-max(win_h, win_w) // _DISPLAY_MAX_PX)
+        out_h, out_w = max(1, win_h // stride), max(1, win_w // stride)
+        crop_raw = ds.read(1, window=win, out_shape=(out_h, out_w))
+        crop_u8  = sar_up_contrast_convert_uint8_pval_ctx(crop_raw, ctx=ctx)
 
-        land_mask = None
+        crop_mask = None
         if vrt_path is not None:
+            # warp the land mask onto the (displayed) crop grid only, not the whole tile
+            crop_tile = SimpleNamespace(
+                name=ds.name,
+                crs=ds.crs,
+                height=out_h,
+                width=out_w,
+                transform=ds.window_transform(win) * Affine.scale(win_w / out_w, win_h / out_h),
+                bounds=BoundingBox(*window_bounds(win, ds.transform)),
+            )
             lmv = LandMaskVRT(vrt_path)
-            land_mask = lmv.get_mask_for_tile(ds)
+            land_mask = crop_mask = lmv.get_mask_for_tile(crop_tile)
             lmv.close()
             total = land_mask.size
-            n_land  = int((land_mask == 1).sum())
-            n_water = int((land_mask == 0).sum())
-            n_nodata= int((land_mask == 255).sum())
+            # count_nonzero on the compare (water: zeros of the mask itself) avoids
+            # .sum()'s integer reduction over a bool array
+            n_land  = np.count_nonzero(land_mask == 1)
+            n_water = total - np.count_nonzero(land_mask)
+            n_nodata= np.count_nonzero(land_mask == 255)
             print(
-                f"Land mask    : land={n_land/total*100:.1f}%  "
+                f"Land mask (crop): land={n_land/total*100:.1f}%  "
                 f"water={n_water/total*100:.1f}%  "
                 f"nodata={n_nodata/total*100:.1f}%"
             )
 
-    r0, r1 = row, row + size
-    c0, c1 = col, col + size
-
-    crop_raw  = img_raw[r0:r1, c0:c1]
-    crop_u8   = img_u8 [r0:r1, c0:c1]
-    crop_mask = land_mask[r0:r1, c0:c1] if land_mask is not None else None
+    # matplotlib (backend probing, font cache) is only loaded once there is something to plot
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
 
     ncols = 4 if crop_mask is not None else 2
     fig, axes = plt.subplots(1, ncols, figsize=(6 * ncols, 6))
     fig.suptitle(img_stem, fontsize=9)
 
-    raw_log = np.log1p(crop_raw.astype(np.float32))
-    axes[0].imshow(raw_log, cmap="gray")
+    # Each panel is 6 in wide, so anything beyond 6 * dpi pixels per side is only
+    # resampled away again by the Agg backend; shrink to that before colouring.
+    panel_px = int(fig.dpi * 6)
+    stride = -(-max(crop_u8.shape) // panel_px)
+    crop_raw = _decimate(crop_raw, stride)
+    crop_u8 = _decimate(crop_u8, stride, mean=True)
+    if crop_mask is not None:
+        crop_mask = _decimate(crop_mask, stride)
+
+    # Every panel is coloured up front as uint8 RGB, so imshow draws it as-is instead of
+    # normalizing + colormapping each array into float RGBA on the main thread. The
+    # panels are independent and numpy releases the GIL, so they are built concurrently.
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        raw_fut = pool.submit(_raw_log_rgb, crop_raw)
+        u8_fut = pool.submit(_gray_rgb, crop_u8, 0, 255)
+        mask_fut = pool.submit(np.take, _MASK_RGB_LUT, crop_mask, axis=0) if crop_mask is not None else None
+        u8_rgb = u8_fut.result()
+        overlay_fut = pool.submit(_composite_overlay, u8_rgb, crop_mask) if crop_mask is not None else None
+        raw_rgb = raw_fut.result()
+
+    axes[0].imshow(raw_rgb)
     axes[0].set_title("Raw SAR (log scale)")
     axes[0].axis("off")
 
-    axes[1].imshow(crop_u8, cmap="gray", vmin=0, vmax=255)
+    axes[1].imshow(u8_rgb)
     axes[1].set_title("SAR uint8 (dB stretched)")
     axes[1].axis("off")
 
     if crop_mask is not None:
-        cmap_mask = ListedColormap(
-            [_WATER_COLOUR[:3], _LAND_COLOUR[:3], _NODATA_COLOUR[:3]]
-        )
-        im = axes[2].imshow(
-            np.where(crop_mask == 255, 2, crop_mask),  # remap nodata→2 for 3-class cmap
-            cmap=cmap_mask, vmin=0, vmax=2, interpolation="nearest",
-        )
+        # uint8 RGB straight from the LUT: matplotlib skips normalizing and
+        # colormapping the mask into a float RGBA copy
+        axes[2].imshow(mask_fut.result(), interpolation="nearest")
         legend_patches = [
             mpatches.Patch(color=_WATER_COLOUR[:3], label="Water (0)"),
             mpatches.Patch(color=_LAND_COLOUR[:3],  label="Land (1)"),
@@ -148,8 +239,7 @@ def visualize(
         axes[2].axis("off")
 
         # Overlay: SAR + land mask
-        axes[3].imshow(crop_u8, cmap="gray", vmin=0, vmax=255)
-        axes[3].imshow(_make_overlay(crop_mask), interpolation="nearest")
+        axes[3].imshow(overlay_fut.result(), interpolation="nearest")
         axes[3].legend(handles=legend_patches, loc="lower right", fontsize=7)
         axes[3].set_title("SAR + land mask overlay")
         axes[3].axis("off")
@@ -166,6 +256,7 @@ if __name__ == "__main__":
     parser.add_argument("--row",  type=int, help="Top-left row of crop window")
     parser.add_argument("--col",  type=int, help="Top-left col of crop window")
     parser.add_argument("--size", type=int,  help="Crop window side length in pixels")
+    parser.add_argument("--verbose", action="store_true", help="Also report the black-pixel fraction of the full scene")
     args = parser.parse_args()
 
     visualize(
@@ -175,4 +266,5 @@ if __name__ == "__main__":
         row=args.row,
         col=args.col,
         size=args.size,
+        verbose=args.verbose,
     )